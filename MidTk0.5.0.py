@@ -2,9 +2,19 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 import tkinter.font as tkfont
 import tkinter.simpledialog as simpledialog
+import tkinter.messagebox as messagebox
 import mido
 from mido import Message
+import base64
+import bisect
+import copy
 import json
+import itertools
+import os
+import struct
+import sys
+import zlib
+import time
 import threading
 from queue import SimpleQueue  
 
@@ -26,12 +36,14 @@ COL_BTN_LATCHED = "#ff8800"     # orange when latched
 GRID_SIZE = 10
 MIN_WIDTH = 50
 MIN_HEIGHT = 20
+SPATIAL_CELL = 200              # px per bucket of the group-box/hit-test index
 # Placeholder — reassigned to named fonts after root is created:
 BUTTON_FONT = ("Helvetica", 14, "bold")
 BUTTON_FG = "#ffffff"
 RADIO_PAD = 1
 
 DRF_INSTANCES = []
+_DRF_SEQ = itertools.count()  # creation order, used to keep index results stable
 
 # ---------------- Helpers (safe parsing / unassigned) ----------------
 def _is_unassigned_cc(val) -> bool:
@@ -59,6 +71,257 @@ def _to_int_or_none(val):
     except Exception:
         return None
 
+def _nearest_option_tables(options):
+    """{number: [option index for each value 0..127]} from (index, number|None, value) triples.
+       Each entry is the option whose value is nearest; ties go to the lower index."""
+    by_number = {}
+    for idx, number, value in options:
+        number = _to_int_or_none(number)
+        if number is not None:
+            by_number.setdefault(number, []).append((idx, int(value)))
+    tables = {}
+    for number, candidates in by_number.items():
+        tables[number] = [min(candidates, key=lambda p: abs(p[1] - v))[0] for v in range(128)]
+    return tables
+
+# ---------------- Binary layout format ----------------
+# Compact alternative to the JSON layout (JSON stays the diffable format):
+#   header  : magic, version, flags, #strings, #records, #radio options
+#   strings : uint32 length + UTF-8 bytes each (names, titles, option labels)
+#   records : one fixed-width record per widget (see _LAYOUT_RECORD)
+#   options : fixed-width radio options, referenced by (start, count) from records
+#   groups  : only with _LAYOUT_HAS_GROUPS in the header flags: geometry checksum,
+#             #boxes, then per group box its parent index (-1 = none), #members, member ids
+#   snapshots: only with _LAYOUT_HAS_SNAPSHOTS: #snapshots, then per snapshot
+#             uint32 length + UTF-8 name and uint32 length + (kind, value) byte pairs
+LAYOUT_MAGIC = b"MTKL"
+LAYOUT_VERSION = 1
+LAYOUT_BINARY_EXT = ".mtkl"
+_LAYOUT_HEADER = struct.Struct("<4sHHIII")
+# type, mode, channel (0 = none/inherit), flags, control (-1 = none), value,
+# id (-1 = none), x, y, width, height, name string, option start, option count
+_LAYOUT_RECORD = struct.Struct("<BBbBhhiiiiiIIH")
+_LAYOUT_OPTION = struct.Struct("<Ihh")   # label string, control (-1 = none), value
+_LAYOUT_TYPES = ("slider", "button", "radio", "group_box")
+_LAYOUT_MODES = ("CC", "Note", "Pitch Bend", "Aftertouch")   # file codes; append only
+_LF_LATCH, _LF_LATCHED, _LF_HORIZONTAL, _LF_LOCK_CCS = 1, 2, 4, 8
+_NO_STRING = 0xFFFFFFFF
+_LAYOUT_HAS_GROUPS = 1   # header flags; readers that predate them ignore the trailing sections
+_LAYOUT_HAS_SNAPSHOTS = 2
+
+def _opt_int(val, none=-1):
+    val = _to_int_or_none(val)
+    return none if val is None else val
+
+def layout_to_binary(data) -> bytes:
+    """Encode a layout dict ({"widgets": [...]}, as saved to JSON) in the binary format."""
+    strings, string_ids = [], {}
+    def sid(text):
+        if text is None:
+            return _NO_STRING
+        text = str(text)
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    records, options = [], []
+    for w in data.get("widgets", []):
+        t = w.get("type")
+        if t not in _LAYOUT_TYPES:
+            continue
+        flags = 0
+        opt_start, opt_count = len(options), 0
+        if t == "group_box":
+            name, value = sid(w.get("title", "Group")), 0
+            flags |= _LF_LOCK_CCS if w.get("lock_ccs") else 0
+        elif t == "radio":
+            name, value = _NO_STRING, int(w.get("selected", 0))
+            flags |= _LF_HORIZONTAL if w.get("orientation") == "horizontal" else 0
+            for i, bd in enumerate(w.get("buttons", [])):
+                options.append(_LAYOUT_OPTION.pack(sid(bd.get("label", f"{i+1}")),
+                                                   _opt_int(bd.get("control")), int(bd.get("value", 0))))
+            opt_count = len(options) - opt_start
+        else:
+            name = sid(w.get("name", "Slider" if t == "slider" else "?"))
+            value = int(w.get("value", 0)) if t == "slider" else 0
+            flags |= _LF_LATCH if w.get("latch") else 0
+            flags |= _LF_LATCHED if w.get("latched") else 0
+        mode = w.get("mode", "CC")
+        records.append(_LAYOUT_RECORD.pack(
+            _LAYOUT_TYPES.index(t),
+            _LAYOUT_MODES.index(mode) if mode in _LAYOUT_MODES else 0,
+            _opt_int(w.get("channel"), none=0), flags,
+            _opt_int(w.get("control")), value, _opt_int(w.get("id")),
+            int(w.get("x", 0)), int(w.get("y", 0)), int(w.get("width", 0)), int(w.get("height", 0)),
+            name, opt_start, opt_count))
+
+    groups = data.get("groups")
+    snapshots = data.get("snapshots")
+    header_flags = (_LAYOUT_HAS_GROUPS if groups else 0) | (_LAYOUT_HAS_SNAPSHOTS if snapshots else 0)
+    out = [_LAYOUT_HEADER.pack(LAYOUT_MAGIC, LAYOUT_VERSION, header_flags,
+                               len(strings), len(records), len(options))]
+    for text in strings:
+        raw = text.encode("utf-8")
+        out.append(struct.pack("<I", len(raw)))
+        out.append(raw)
+    out.extend(records)
+    out.extend(options)
+    if groups:
+        out.append(struct.pack("<II", groups["checksum"], len(groups["boxes"])))
+        for box in groups["boxes"]:
+            members = box["members"]
+            out.append(struct.pack(f"<iI{len(members)}i", _opt_int(box["parent"]), len(members), *members))
+    if snapshots:
+        out.append(struct.pack("<I", len(snapshots)))
+        for name, encoded in snapshots.items():
+            raw, values = name.encode("utf-8"), base64.b64decode(encoded)
+            out += [struct.pack("<I", len(raw)), raw, struct.pack("<I", len(values)), values]
+    return b"".join(out)
+
+def layout_from_binary(blob: bytes):
+    """Decode the binary format back into the same layout dict JSON loading yields."""
+    magic, version, header_flags, n_strings, n_records, n_options = _LAYOUT_HEADER.unpack_from(blob, 0)
+    if magic != LAYOUT_MAGIC:
+        raise ValueError("not a binary layout file")
+    if version > LAYOUT_VERSION:
+        raise ValueError(f"binary layout version {version} is newer than supported ({LAYOUT_VERSION})")
+    pos = _LAYOUT_HEADER.size
+    strings = []
+    for _ in range(n_strings):
+        (n,) = struct.unpack_from("<I", blob, pos)
+        strings.append(blob[pos + 4:pos + 4 + n].decode("utf-8"))
+        pos += 4 + n
+    rec_base = pos
+    opt_base = rec_base + n_records * _LAYOUT_RECORD.size
+    options = [_LAYOUT_OPTION.unpack_from(blob, opt_base + i * _LAYOUT_OPTION.size) for i in range(n_options)]
+
+    def opt(val):
+        return None if val < 0 else val
+
+    widgets = []
+    for (t, mode, ch, flags, control, value, cid, x, y, w, h, name, o_start, o_count) \
+            in _LAYOUT_RECORD.iter_unpack(blob[rec_base:opt_base]):
+        t = _LAYOUT_TYPES[t]
+        geom = {"x": x, "y": y, "width": w, "height": h}
+        if t == "group_box":
+            widgets.append({"type": t, "title": strings[name], "channel": ch or None,
+                            "lock_ccs": bool(flags & _LF_LOCK_CCS), **geom})
+            continue
+        st = {"type": t, "id": opt(cid), "mode": _LAYOUT_MODES[mode], "channel": ch or None}
+        if t == "radio":
+            st["selected"] = value
+            st["orientation"] = "horizontal" if flags & _LF_HORIZONTAL else "vertical"
+            st["buttons"] = [{"label": strings[lbl], "control": opt(c), "value": v}
+                             for lbl, c, v in options[o_start:o_start + o_count]]
+        else:
+            st["name"] = strings[name]
+            st["control"] = opt(control)
+            if t == "slider":
+                st["value"] = value
+            else:
+                st["latch"] = bool(flags & _LF_LATCH)
+                st["latched"] = bool(flags & _LF_LATCHED)
+        st.update(geom)
+        widgets.append(st)
+    data = {"widgets": widgets}
+    pos = opt_base + n_options * _LAYOUT_OPTION.size
+    if header_flags & _LAYOUT_HAS_GROUPS:
+        checksum, n_boxes = struct.unpack_from("<II", blob, pos)
+        pos += 8
+        boxes = []
+        for _ in range(n_boxes):
+            parent, n = struct.unpack_from("<iI", blob, pos)
+            members = list(struct.unpack_from(f"<{n}i", blob, pos + 8))
+            pos += 8 + 4 * n
+            boxes.append({"parent": opt(parent), "members": members})
+        data["groups"] = {"checksum": checksum, "boxes": boxes}
+    if header_flags & _LAYOUT_HAS_SNAPSHOTS:
+        (count,) = struct.unpack_from("<I", blob, pos)
+        pos += 4
+        snapshots = {}
+        for _ in range(count):
+            (n,) = struct.unpack_from("<I", blob, pos)
+            name = blob[pos + 4:pos + 4 + n].decode("utf-8")
+            pos += 4 + n
+            (n,) = struct.unpack_from("<I", blob, pos)
+            snapshots[name] = base64.b64encode(blob[pos + 4:pos + 4 + n]).decode("ascii")
+            pos += 4 + n
+        data["snapshots"] = snapshots
+    return data
+
+def read_layout_file(path):
+    """Layout dict from a JSON or binary layout file (detected by its magic bytes)."""
+    with open(path, "rb") as f:
+        blob = f.read()
+    if blob[:4] == LAYOUT_MAGIC:
+        return layout_from_binary(blob)
+    return json.loads(blob.decode("utf-8"))
+
+def write_layout_file(path, data):
+    """Write binary when the path ends in LAYOUT_BINARY_EXT, else indented JSON."""
+    tmp = path + ".tmp"   # written aside and renamed, so a crash never leaves half a file
+    if path.lower().endswith(LAYOUT_BINARY_EXT):
+        with open(tmp, "wb") as f:
+            f.write(layout_to_binary(data))
+    else:
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def convert_layout_file(src, dst):
+    """JSON <-> binary converter; the direction follows the two file names."""
+    write_layout_file(dst, read_layout_file(src))
+
+def benchmark_layout_formats(data, repeats=5):
+    """Print and return size and best-of-`repeats` encode/decode times for JSON vs binary."""
+    def best(fn):
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times) * 1000.0
+
+    js = json.dumps(data, indent=2)
+    blob = layout_to_binary(data)
+    result = {
+        "widgets": len(data.get("widgets", [])),
+        "json_bytes": len(js.encode("utf-8")), "binary_bytes": len(blob),
+        "json_save_ms": best(lambda: json.dumps(data, indent=2)),
+        "binary_save_ms": best(lambda: layout_to_binary(data)),
+        "json_load_ms": best(lambda: json.loads(js)),
+        "binary_load_ms": best(lambda: layout_from_binary(blob)),
+    }
+    print("Layout format benchmark:", result)
+    return result
+
+# ---------------- Command line ----------------
+def _run_cli(argv):
+    """Layout file utilities that run without opening a window:
+         --convert SRC DST   JSON <-> binary (direction follows the file names)
+         --benchmark FILE    size and encode/decode times of FILE in both formats
+       Returns an exit status, or None when the GUI should start."""
+    if not argv or argv[0] not in ("--convert", "--benchmark"):
+        return None
+    try:
+        if argv[0] == "--convert" and len(argv) == 3:
+            convert_layout_file(argv[1], argv[2])
+            print(f"Converted {argv[1]} -> {argv[2]}")
+            return 0
+        if argv[0] == "--benchmark" and len(argv) == 2:
+            benchmark_layout_formats(read_layout_file(argv[1]))
+            return 0
+    except Exception as e:
+        print("Error:", e)
+        return 1
+    print("usage: MidTk0.5.0.py [--convert SRC DST | --benchmark FILE]")
+    return 2
+
+_cli_status = _run_cli(sys.argv[1:])
+if _cli_status is not None:
+    sys.exit(_cli_status)
+
 # ---------------- Root / fonts ----------------
 root = tk.Tk()
 
@@ -152,8 +415,13 @@ style.map(
 
 def toggle_lock():
     locked.set(not locked.get())
-    for fr in DRF_INSTANCES:
-        fr.update_grips()
+    if locked.get():
+        clear_selection()
+    host = GRIP_HOST["frame"]
+    if host is not None:
+        host.update_grips()
+    if CANVAS_SURFACE is not None:
+        CANVAS_SURFACE.update_grips()
     print("Locked:", locked.get())
 
 DEFAULT_WIDTH = MIN_WIDTH
@@ -162,7 +430,7 @@ DEFAULT_HEIGHT_BUTTON = MIN_WIDTH
 WIDGET_WIDTH = 60
 SPAWN_GAP = 2
 
-import time  # for lightweight motion throttling
+DRAG_FRAME_MS = 16  # pointer motion is applied at most once per display frame (~60 Hz)
 
 # --- Guard to prevent MIDI echo/feedback when reflecting incoming MIDI to UI ---
 UPDATING_FROM_MIDI = False
@@ -170,9 +438,28 @@ UPDATING_FROM_MIDI = False
 # --- Grouping support ---
 group_boxes = []  # holds GroupBoxFrame instances
 
+# --- Canvas renderer (set while controls are drawn as canvas items) ---
+CANVAS_SURFACE = None
+
+# --- Viewport virtualization (set while off-screen controls are kept as records) ---
+VIRTUAL_LAYOUT = None
+VIRTUAL_MARGIN = 400     # px beyond the visible area that stays materialized
+VR_SCHEDULED = False
+
+# Batch operations set this so add_*() skip the per-widget group-box pass
+DEFER_GROUP_ASSIGN = False
+# Set while loading a layout whose saved memberships are trusted (see _restore_memberships);
+# add_*() and group boxes then skip all spatial linking and channel/CC assignment
+TRUST_SAVED_GROUPS = False
+
+# --- Chunked loading: widgets built per event-loop turn, cancellable ---
+LOAD_CHUNK = 40
+_LOAD = {"after": None, "cancel": None}
+
 # ---- Scrollregion coalescing & suppression (ANTI-JITTER) ----
 SR_SCHEDULED = False
 SUPPRESS_SCROLL_UPDATES = False
+_SUPPRESS_DEPTH = 0   # nested _begin_suppression() calls (a drag during a chunked load)
 # We temporarily unbind <Configure> on these to stop layout thrash during group moves
 _CFG_BOUND = {"scrollable": True, "canvas": True}
 
@@ -204,7 +491,15 @@ v_scroll.grid(row=0, column=1, sticky="ns")
 h_scroll = tk.Scrollbar(canvas_container, orient="horizontal", command=canvas.xview, width=SCROLLBAR_WIDTH)
 h_scroll.grid(row=1, column=0, sticky="ew")
 
-canvas.configure(xscrollcommand=h_scroll.set, yscrollcommand=v_scroll.set)
+def _on_xscroll(*args):
+    h_scroll.set(*args)
+    schedule_viewport_refresh()
+
+def _on_yscroll(*args):
+    v_scroll.set(*args)
+    schedule_viewport_refresh()
+
+canvas.configure(xscrollcommand=_on_xscroll, yscrollcommand=_on_yscroll)
 
 scrollable_frame = tk.Frame(canvas, bg=COL_BG)
 window_id = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
@@ -305,52 +600,60 @@ def open_radio_group_setup(radio_group):
         if high < low: high = low
         return max(0, min(127, (low + high) // 2))
 
-    def build_entries(recompute_values: bool):
-        for w in list_frame.winfo_children(): w.destroy()
-        entries.clear()
+    hdr = {"bg": COL_FRAME, "fg": COL_TEXT, "font": FONT_HEADER}
+    tk.Label(list_frame, text="Label", **hdr).grid(row=0, column=0, padx=4, pady=4, sticky="w")
+    tk.Label(list_frame, text="Value (0–127)", **hdr).grid(row=0, column=1, padx=4, pady=4)
+    list_frame.grid_columnconfigure(0, weight=1)
+    list_frame.grid_columnconfigure(1, weight=0)
 
+    rows = []                    # (label_var, val_var, entry, spinbox) per option
+    pending = {"id": None}       # debounced sync_rows() while the count is being typed
+
+    def sync_rows():
+        """Add/remove only the rows whose count changed; values are re-spread over the new count."""
+        pending["id"] = None
+        if not win.winfo_exists():
+            return
         try:
-            n = max(1, int(num_var.get()))
+            n = max(1, min(64, int(num_var.get())))
         except Exception:
-            n = 1
-
-        hdr = {"bg": COL_FRAME, "fg": COL_TEXT, "font": FONT_HEADER}
-        tk.Label(list_frame, text="Label", **hdr).grid(row=0, column=0, padx=4, pady=4, sticky="w")
-        tk.Label(list_frame, text="Value (0–127)", **hdr).grid(row=0, column=1, padx=4, pady=4)
-
-        keep_existing = (not recompute_values) and (n == len(radio_group.button_data))
-
-        for i in range(n):
-            label_var = tk.StringVar()
-            val_var   = tk.StringVar()
-
-            if i < len(radio_group.button_data) and keep_existing:
-                bd = radio_group.button_data[i]
-                label_var.set(bd.get("label", f"{i+1}"))
-                val_var.set(str(int(bd.get("value", bucket_mid(i, n)))))
-            else:
-                label_var.set(radio_group.button_data[i]["label"] if i < len(radio_group.button_data) else f"{i+1}")
-                val_var.set(str(bucket_mid(i, n)))
-
-            tk.Entry(list_frame, textvariable=label_var, width=18,
-                     bg=COL_BG, fg=COL_ACCENT, insertbackground=COL_ACCENT,
-                     relief="flat", font=FONT_UI)\
-                .grid(row=i+1, column=0, padx=4, pady=2, sticky="we")
-
-            tk.Spinbox(list_frame, from_=0, to=127, textvariable=val_var, width=4, relief="flat",
-                       bg=COL_BG, fg=COL_ACCENT, insertbackground=COL_ACCENT, font=FONT_UI)\
-                .grid(row=i+1, column=1, padx=4, pady=2, sticky="w")
-
-            entries.append((label_var, val_var))
-
-        list_frame.grid_columnconfigure(0, weight=1)
-        list_frame.grid_columnconfigure(1, weight=0)
-        win.after_idle(lambda: lst_canvas.yview_moveto(0.0))
-
-        win.update_idletasks()
-        win.minsize(win.winfo_reqwidth(), win.winfo_reqheight())
+            return   # mid-edit (e.g. empty field); wait for a valid number
+
+        while len(rows) > n:
+            _lv, _vv, ent, spn = rows.pop()
+            ent.destroy(); spn.destroy()
+
+        for i in range(len(rows), n):
+            label_var = tk.StringVar(value=radio_group.button_data[i]["label"]
+                                     if i < len(radio_group.button_data) else f"{i+1}")
+            val_var = tk.StringVar()
+            ent = tk.Entry(list_frame, textvariable=label_var, width=18,
+                           bg=COL_BG, fg=COL_ACCENT, insertbackground=COL_ACCENT,
+                           relief="flat", font=FONT_UI)
+            ent.grid(row=i+1, column=0, padx=4, pady=2, sticky="we")
+            spn = tk.Spinbox(list_frame, from_=0, to=127, textvariable=val_var, width=4, relief="flat",
+                             bg=COL_BG, fg=COL_ACCENT, insertbackground=COL_ACCENT, font=FONT_UI)
+            spn.grid(row=i+1, column=1, padx=4, pady=2, sticky="w")
+            rows.append((label_var, val_var, ent, spn))
+
+        for i, (_lv, val_var, _e, _s) in enumerate(rows):
+            val_var.set(str(bucket_mid(i, n)))
+        entries[:] = [(lv, vv) for lv, vv, _e, _s in rows]
+
+        def fit():
+            if win.winfo_exists():
+                win.minsize(win.winfo_reqwidth(), win.winfo_reqheight())
+        win.after_idle(fit)
+
+    def schedule_sync(*_):
+        if pending["id"] is not None:
+            win.after_cancel(pending["id"])
+        pending["id"] = win.after(150, sync_rows)
 
     def apply_changes():
+        if pending["id"] is not None:
+            win.after_cancel(pending["id"])
+            sync_rows()
         shared_control = _to_int_or_none(cc_all_var.get())
         new_data = []
         for label, val in entries:
@@ -370,10 +673,9 @@ def open_radio_group_setup(radio_group):
             radio_group.update_visuals()
         win.destroy()
 
-    num_spin.config(command=lambda: build_entries(recompute_values=True))
-    num_var.trace_add("write", lambda *_: build_entries(recompute_values=True))
-
-    build_entries(recompute_values=True)
+    num_var.trace_add("write", schedule_sync)   # spinbox arrows write num_var too
+    sync_rows()
+    win.after_idle(lambda: lst_canvas.yview_moveto(0.0))
 
     tk.Button(bottom, text="Apply", command=apply_changes,
               bg=COL_ACCENT, fg=COL_TEXT, font=FONT_BUTTON,
@@ -388,17 +690,48 @@ def open_radio_group_setup(radio_group):
     pos_y = root_y + (root_h // 2) - (win_h // 2)
     win.geometry(f"+{pos_x}+{pos_y}")
 
+# ---- Layout extents, kept up to date from DraggableResizableFrame.place() ----
+# Tracks the furthest right/bottom edge and which frame defines it, so the
+# scroll region never has to walk every child. A rescan of the cached
+# rectangles only happens after the defining frame is removed or moves inward.
+_EXTENTS = {"right": 0, "bottom": 0, "right_of": None, "bottom_of": None, "dirty": False}
+
+def _extents_on_place(drf, rect):
+    ex = _EXTENTS
+    _, _, r, b = rect
+    if r >= ex["right"]:
+        ex["right"], ex["right_of"] = r, drf
+    elif ex["right_of"] is drf:
+        ex["dirty"] = True
+    if b >= ex["bottom"]:
+        ex["bottom"], ex["bottom_of"] = b, drf
+    elif ex["bottom_of"] is drf:
+        ex["dirty"] = True
+
+def _extents_on_remove(drf):
+    ex = _EXTENTS
+    if drf is ex["right_of"] or drf is ex["bottom_of"]:
+        ex["dirty"] = True
+
+def _layout_extents():
+    """Return (max_right, max_bottom) of all placed frames."""
+    ex = _EXTENTS
+    if ex["dirty"]:
+        ex.update(right=0, bottom=0, right_of=None, bottom_of=None, dirty=False)
+        for index in (CONTROL_INDEX, GROUP_INDEX):
+            for drf, rect in index.items():
+                _extents_on_place(drf, rect)
+    return ex["right"], ex["bottom"]
+
 def update_scroll_region():
     global SR_W, SR_H
-    max_right = 0
-    max_bottom = 0
-    for child in scrollable_frame.winfo_children():
-        if isinstance(child, tk.Frame):
-            child.update_idletasks()
-            r = child.winfo_x() + child.winfo_width()
-            b = child.winfo_y() + child.winfo_height()
-            if r > max_right:  max_right = r
-            if b > max_bottom: max_bottom = b
+    if CANVAS_SURFACE is not None:
+        max_right, max_bottom = CANVAS_SURFACE.extents()
+    else:
+        max_right, max_bottom = _layout_extents()
+    if VIRTUAL_LAYOUT is not None:
+        vr, vb = VIRTUAL_LAYOUT.extents()
+        max_right, max_bottom = max(max_right, vr), max(max_bottom, vb)
 
     needed_w = max_right + PADDING
     needed_h = max_bottom + PADDING
@@ -470,10 +803,10 @@ def get_spawn_geometry(widget_list, fallback_height):
     try:
         if widget_list:
             last_widget = widget_list[-1]["frame"] if isinstance(widget_list[-1], dict) else widget_list[-1].master
-            last_widget.update_idletasks()
-            last_x = int(last_widget.winfo_x())
-            last_y = int(last_widget.winfo_y())
-            last_width = int(last_widget.winfo_width())
+            geom = last_widget._geom
+            last_x = int(geom["x"])
+            last_y = int(geom["y"])
+            last_width = int(geom["width"])
             x = last_x + last_width + SPAWN_GAP
             y = last_y
         else:
@@ -614,12 +947,9 @@ class MidiButtonFrame(tk.Frame):
         menu.tk_popup(event.x_root, event.y_root)
 
     def get_state(self):
-        if self.master:
-            self.master.update_idletasks()
-            info = self.master.place_info()
-        else:
-            info = {"x": 100, "y": 100, "width": 120, "height": 100}
+        info = getattr(self.master, "_geom", None) or {"x": 100, "y": 100, "width": 120, "height": 100}
         return {
+            "id": getattr(self.master, "_cid", None),
             "name": self.name.get(),
             "mode": self.mode.get(),
             "channel": _to_channel_int_or_none(self.channel.get()),
@@ -669,6 +999,10 @@ class MidiRadioGroupFrame(tk.Frame):
 
         self.control_map = {}   # idx -> (label, control|None, value)
         self.buttons = []
+        self._labels = []       # text currently shown on each button
+        self._grid = (None, 0)  # (horizontal?, slots laid out)
+        self._lit = None        # index currently drawn as selected
+        self._lookup = {}       # bound CC/note -> 128-entry value -> option index table
         self.container = None
 
         self.rebuild_controls()
@@ -676,26 +1010,26 @@ class MidiRadioGroupFrame(tk.Frame):
         self.update_visuals()
 
     def rebuild_controls(self):
-        try:
-            if getattr(self, "container", None) and self.container.winfo_exists():
-                self.container.destroy()
-        except Exception:
-            pass
-
-        self.control_map = {}
-        self.buttons = []
-
-        self.container = tk.Frame(self, bg=COL_FRAME)
-        self.container.pack(fill="both", expand=True, padx=RADIO_PAD, pady=RADIO_PAD)
-        self.container.pack_propagate(False)
-        self.container.grid_propagate(False)
+        """Sync the Radiobuttons with button_data, touching only options that changed."""
+        if self.container is None:
+            self.container = tk.Frame(self, bg=COL_FRAME)
+            self.container.pack(fill="both", expand=True, padx=RADIO_PAD, pady=RADIO_PAD)
+            self.container.pack_propagate(False)
+            self.container.grid_propagate(False)
+            self.bind("<Button-3>", self.show_context_menu)
+
+        n = len(self.button_data)
+        while len(self.buttons) > n:
+            self.buttons.pop().destroy()
+            self._labels.pop()
 
         for idx, data in enumerate(self.button_data):
-            label   = data.get("label", f"{idx+1}")
-            control = data.get("control", None)  # may be None
-            value   = int(data.get("value", 0))
-            self.control_map[idx] = (label, control, value)
-
+            label = data.get("label", f"{idx+1}")
+            if idx < len(self.buttons):
+                if self._labels[idx] != label:
+                    self.buttons[idx].config(text=label)
+                    self._labels[idx] = label
+                continue
             rb = tk.Radiobutton(
                 self.container,
                 text=label,
@@ -712,68 +1046,70 @@ class MidiRadioGroupFrame(tk.Frame):
                 relief="flat",
                 bd=2,
             )
-            self.buttons.append(rb)
-
-        if self.orientation.get() == "horizontal":
-            cols = len(self.buttons)
-            for c in range(cols):
-                self.container.grid_columnconfigure(c, weight=1, uniform="rb")
-            self.container.grid_rowconfigure(0, weight=1, uniform="rb")
-            for c, rb in enumerate(self.buttons):
-                rb.grid(row=0, column=c, padx=RADIO_PAD, pady=RADIO_PAD, sticky="nsew")
-        else:
-            rows = len(self.buttons)
-            for r in range(rows):
-                self.container.grid_rowconfigure(r, weight=1, uniform="rb")
-            self.container.grid_columnconfigure(0, weight=1, uniform="rb")
-            for r, rb in enumerate(self.buttons):
-                rb.grid(row=r, column=0, padx=RADIO_PAD, pady=RADIO_PAD, sticky="nsew")
-
-        self.bind("<Button-3>", self.show_context_menu)
-        for rb in self.buttons:
             rb.bind("<Button-3>", self.show_context_menu)
+            self.buttons.append(rb)
+            self._labels.append(label)
 
-        self.update_idletasks()
-        try:
-            self.container.minsize(1, 1)
-        except Exception:
-            pass
+        self._layout_buttons()
+        self.refresh_bindings()
         self.update_visuals()
 
+    def _layout_buttons(self):
+        """Grid only the slots that were added/removed, or all of them after an orientation change."""
+        horizontal = self.orientation.get() == "horizontal"
+        was_horizontal, laid = self._grid
+        n = len(self.buttons)
+        if horizontal != was_horizontal:
+            if was_horizontal is not None:
+                old_cfg = self.container.grid_columnconfigure if was_horizontal else self.container.grid_rowconfigure
+                for i in range(laid):
+                    old_cfg(i, weight=0, uniform="")
+            laid = 0
+
+        cfg = self.container.grid_columnconfigure if horizontal else self.container.grid_rowconfigure
+        for i in range(n, laid):
+            cfg(i, weight=0, uniform="")
+        for i in range(laid, n):
+            cfg(i, weight=1, uniform="rb")
+            row, col = (0, i) if horizontal else (i, 0)
+            self.buttons[i].grid(row=row, column=col, padx=RADIO_PAD, pady=RADIO_PAD, sticky="nsew")
+        cross = self.container.grid_rowconfigure if horizontal else self.container.grid_columnconfigure
+        cross(0, weight=1, uniform="rb")
+        self._grid = (horizontal, n)
+
+    def refresh_bindings(self):
+        """Recompute control_map from button_data (CC/value edits need no widget work)."""
+        self.control_map = {
+            idx: (data.get("label", f"{idx+1}"), data.get("control", None), int(data.get("value", 0)))
+            for idx, data in enumerate(self.button_data)
+        }
+        self._lookup = _nearest_option_tables(
+            (idx, ctrl, val) for idx, (_lbl, ctrl, val) in self.control_map.items())
+        _track_binding(self.master)
+
     def update_visuals(self):
+        """Light the selected option; only the previously lit and the selected button are touched."""
         sel = self.selected.get()
-        for idx, rb in enumerate(self.buttons):
-            is_sel = (idx == sel)
-            rb.config(
-                bg=COL_BTN_LATCHED if is_sel else COL_BTN,
-                activebackground=COL_BTN_LATCHED if is_sel else COL_BTN
-            )
+        for idx in {self._lit, sel}:
+            if idx is not None and 0 <= idx < len(self.buttons):
+                is_sel = (idx == sel)
+                self.buttons[idx].config(
+                    bg=COL_BTN_LATCHED if is_sel else COL_BTN,
+                    activebackground=COL_BTN_LATCHED if is_sel else COL_BTN
+                )
+        self._lit = sel
 
     def _index_for_cc(self, control_num: int, value: int):
-        cnum = int(control_num)
-        candidates = []
-        for idx, (_lbl, ctrl, val) in self.control_map.items():
-            if ctrl is None:
-                continue
-            if int(ctrl) == cnum:
-                candidates.append((idx, int(val)))
-        if not candidates:
+        table = self._lookup.get(int(control_num))
+        if table is None:
             return None
-        value = max(0, min(127, int(value)))
-        return min(candidates, key=lambda p: abs(p[1] - value))[0]
+        return table[max(0, min(127, int(value)))]
 
     def _index_for_note(self, note_num: int, velocity: int):
-        nnum = int(note_num)
-        candidates = []
-        for idx, (_lbl, note, val) in self.control_map.items():
-            if note is None:
-                continue
-            if int(note) == nnum:
-                candidates.append((idx, int(val)))
-        if not candidates:
+        table = self._lookup.get(int(note_num))
+        if table is None:
             return None
-        velocity = max(0, min(127, int(velocity)))
-        return min(candidates, key=lambda p: abs(p[1] - velocity))[0]
+        return table[max(0, min(127, int(velocity)))]
 
     def set_from_midi_cc(self, control_num: int, value: int):
         idx = self._index_for_cc(control_num, value)
@@ -828,17 +1164,14 @@ class MidiRadioGroupFrame(tk.Frame):
             pass
 
     def get_state(self):
-        if self.master:
-            self.master.update_idletasks()
-            info = self.master.place_info()
-        else:
-            info = {"x": 100, "y": 100, "width": 200, "height": 200}
+        info = getattr(self.master, "_geom", None) or {"x": 100, "y": 100, "width": 200, "height": 200}
         return {
             "type": "radio",
+            "id": getattr(self.master, "_cid", None),
             "mode": self.mode.get(),
             "channel": _to_channel_int_or_none(self.channel.get()),
             "selected": self.selected.get(),
-            "buttons": self.button_data,
+            "buttons": [dict(bd) for bd in self.button_data],
             "orientation": self.orientation.get(),
             "x": int(info.get("x", 100)),
             "y": int(info.get("y", 100)),
@@ -853,6 +1186,74 @@ class MidiRadioGroupFrame(tk.Frame):
 
 
 
+class DragEngine:
+    """Shared motion coalescer for every drag in the layout.
+
+    <B1-Motion> handlers only push() the pointer; the latest position is applied
+    at most once per DRAG_FRAME_MS, so the cost per frame is flat no matter how
+    fast the mouse reports. finish() cancels the pending tick and applies the
+    release position, so the final event is never dropped.
+    """
+    def __init__(self):
+        self._apply = None
+        self._latest = None
+        self._after_id = None
+
+    @property
+    def active(self):
+        return self._apply is not None
+
+    def begin(self, apply):
+        self._cancel()
+        self._apply = apply
+        self._latest = None
+
+    def push(self, event):
+        if self._apply is None:
+            return
+        self._latest = (event.x_root, event.y_root)
+        if self._after_id is None:
+            self._after_id = root.after(DRAG_FRAME_MS, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        if self._apply is not None and self._latest is not None:
+            pos, self._latest = self._latest, None
+            self._apply(*pos)
+
+    def finish(self, event=None):
+        self._cancel()
+        if event is not None:
+            self._latest = (event.x_root, event.y_root)
+        apply, self._apply = self._apply, None
+        if apply is not None and self._latest is not None:
+            apply(*self._latest)
+        self._latest = None
+
+    def _cancel(self):
+        if self._after_id is not None:
+            try:
+                root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+DRAG = DragEngine()
+
+def schedule_viewport_refresh():
+    """Queue one virtual-layout refresh for the next idle moment (scroll/resize)."""
+    global VR_SCHEDULED
+    if VIRTUAL_LAYOUT is None or VR_SCHEDULED:
+        return
+    VR_SCHEDULED = True
+    root.after_idle(_perform_viewport_refresh)
+
+def _perform_viewport_refresh():
+    global VR_SCHEDULED
+    VR_SCHEDULED = False
+    if VIRTUAL_LAYOUT is not None:
+        VIRTUAL_LAYOUT.refresh()
+
 def schedule_scroll_update():
     """Queue a single scrollregion update for the next idle moment."""
     global SR_SCHEDULED
@@ -870,7 +1271,10 @@ def _perform_scroll_update():
 
 def _begin_suppression():
     """Stop churn from <Configure> while we drag/resize groups."""
-    global SUPPRESS_SCROLL_UPDATES, _CFG_BOUND
+    global SUPPRESS_SCROLL_UPDATES, _CFG_BOUND, _SUPPRESS_DEPTH
+    _SUPPRESS_DEPTH += 1
+    if _SUPPRESS_DEPTH > 1:
+        return
     SUPPRESS_SCROLL_UPDATES = True
     # Temporarily disable handlers that cause reflow
     if _CFG_BOUND["scrollable"]:
@@ -887,8 +1291,13 @@ def _begin_suppression():
         _CFG_BOUND["canvas"] = False
 
 def _end_suppression():
-    """Re-enable handlers and do exactly one scroll update."""
-    global SUPPRESS_SCROLL_UPDATES, _CFG_BOUND
+    """Re-enable handlers and do exactly one scroll update (when the outermost caller ends)."""
+    global SUPPRESS_SCROLL_UPDATES, _CFG_BOUND, _SUPPRESS_DEPTH
+    if _SUPPRESS_DEPTH == 0:
+        return
+    _SUPPRESS_DEPTH -= 1
+    if _SUPPRESS_DEPTH:
+        return
     SUPPRESS_SCROLL_UPDATES = False
     # Rebind the handlers we disabled
     try:
@@ -907,13 +1316,40 @@ def _end_suppression():
 # ---------------- Background (canvas) context menu ----------------
 def show_background_menu(event):
     menu = tk.Menu(root, tearoff=0, bg=COL_FRAME, fg=COL_TEXT, activebackground=COL_ACCENT, font=FONT_UI)
-    menu.add_command(label="Add Slider", command=add_slider)
-    menu.add_command(label="Add Button", command=add_midi_button)
-    menu.add_command(label="Add Radio Group", command=add_radio_group)
-    menu.add_command(label="Add Group Box", command=add_group_box)
+    if CANVAS_SURFACE is not None:
+        menu.add_command(label="Add Slider", command=lambda: CANVAS_SURFACE.add("slider"))
+        menu.add_command(label="Add Button", command=lambda: CANVAS_SURFACE.add("button"))
+        menu.add_command(label="Add Radio Group", command=lambda: CANVAS_SURFACE.add("radio"))
+        menu.add_command(label="Add Group Box", command=lambda: CANVAS_SURFACE.add("group_box"))
+    else:
+        menu.add_command(label="Add Slider", command=add_slider)
+        menu.add_command(label="Add Button", command=add_midi_button)
+        menu.add_command(label="Add Radio Group", command=add_radio_group)
+        menu.add_command(label="Add Group Box", command=add_group_box)
+    if CANVAS_SURFACE is None:   # canvas records claim no slots, so usage would read empty
+        menu.add_separator()
+        menu.add_command(label="CC Usage / Conflicts", command=show_ccs_by_channel_window)
+        menu.add_command(label="Assign All CCs…", command=open_assign_all_planner)
+        menu.add_separator()
+        menu.add_command(label="Store Snapshot…", command=_store_snapshot_dialog)
+        if SNAPSHOT_BANK:
+            recall_menu = tk.Menu(menu, tearoff=0, bg=COL_FRAME, fg=COL_TEXT,
+                                  activebackground=COL_ACCENT, font=FONT_UI)
+            delete_menu = tk.Menu(menu, tearoff=0, bg=COL_FRAME, fg=COL_TEXT,
+                                  activebackground=COL_ACCENT, font=FONT_UI)
+            for name in SNAPSHOT_BANK:
+                recall_menu.add_command(label=name, command=lambda n=name: recall_snapshot(n))
+                delete_menu.add_command(label=name, command=lambda n=name: delete_snapshot(n))
+            menu.add_cascade(label="Recall Snapshot", menu=recall_menu)
+            menu.add_cascade(label="Delete Snapshot", menu=delete_menu)
     menu.add_separator()
     menu.add_command(label="Save Setup", command=save_state)
     menu.add_command(label="Load Setup", command=load_state)
+    renderer_label = "Use Widget Renderer" if CANVAS_SURFACE is not None else "Use Canvas Renderer (large layouts)"
+    menu.add_command(label=renderer_label, command=toggle_canvas_renderer)
+    if CANVAS_SURFACE is None:
+        virt_label = "Materialize All Controls" if VIRTUAL_LAYOUT is not None else "Virtualize Off-screen Controls"
+        menu.add_command(label=virt_label, command=toggle_virtual_layout)
 
     def _toggle_lock():
         toggle_lock()
@@ -936,52 +1372,139 @@ def show_background_menu(event):
     menu.tk_popup(event.x_root, event.y_root)
 
 # ---------------- Utilities for CC assignment ----------------
-def _collect_used_cc_for_channel(channel_int: int) -> set:
-    """Return a set of CC numbers already used on a given 1-based MIDI channel."""
-    used = set()
-
-    # Sliders
-    for entry in sliders:
-        try:
-            ch = _to_channel_int_or_none(entry["channel"].get())
-            if ch == channel_int:
-                c = entry["control"].get()
-                if not _is_unassigned_cc(c):
-                    used.add(int(c))
-        except Exception:
-            pass
-
-    # Buttons
-    for btn in buttons:
-        try:
-            ch = _to_channel_int_or_none(btn.channel.get())
-            if ch == channel_int:
-                c = btn.control.get()
-                if not _is_unassigned_cc(c):
-                    used.add(int(c))
-        except Exception:
-            pass
-
-    # Radio groups
-    for rg in radio_groups:
-        try:
-            g = rg["group"]
-            ch = _to_channel_int_or_none(g.channel.get())
-            if ch == channel_int:
-                for bd in getattr(g, "button_data", []):
-                    c = bd.get("control", None)
-                    if c is not None and not _is_unassigned_cc(c):
-                        used.add(int(c))
-        except Exception:
-            pass
-
-    return used
-
-
-def _next_free_cc_across_channels(start_channel: int = 1):
+# Slot occupancy is kept per (channel, message type) as a 128-bit int (bit n =
+# number n in use) plus the ids holding each slot, fed by variable traces on each
+# control's mode/channel/CC vars (radios also report from refresh_bindings;
+# off-screen VirtualLayout records claim theirs through a _RecordBinding).
+# CC and Note numbers are separate namespaces; Pitch Bend and Aftertouch have no
+# number, so they occupy slot 0 of their own namespace. Queries never walk the layout.
+SLOT_NAMESPACES = ("CC", "Note", "Pitch Bend", "Aftertouch")
+NUMBERED_NAMESPACES = ("CC", "Note")
+_CC_USAGE = {}   # (channel 1..16, namespace) -> {number: [control ids]}
+_CC_BITS = {}    # (channel 1..16, namespace) -> occupancy bitmap
+_CC_ASSIGNABLE = sum(1 << n for n in range(128) if n not in RESERVED_CCS)
+_NOTE_ASSIGNABLE = (1 << 128) - 1
+_BINDINGS = {}   # control frame -> (control id, tuple of (channel, namespace, number) it holds)
+_WATCHED = {}    # control frame -> (kind, handle) for frames whose traces are live
+_USAGE_LISTENERS = []   # callables taking the set of (channel, namespace, number) slots that changed
+
+def _assignable_mask(namespace):
+    return _CC_ASSIGNABLE if namespace == "CC" else _NOTE_ASSIGNABLE
+
+# Persistent control ids: saved as "id" in each control's state so other
+# features can refer to a control across save/load.
+_CONTROL_IDS = {}   # id -> live control frame
+_NEXT_CID = 1
+
+def _note_control_id(cid):
+    """Keep freshly allocated ids clear of one that exists outside the live layout."""
+    global _NEXT_CID
+    cid = _to_int_or_none(cid)
+    if cid is not None and cid >= _NEXT_CID:
+        _NEXT_CID = cid + 1
+
+def _set_control_id(frame, cid=None):
+    """Give a control frame its saved id if that is free, else a new one."""
+    cid = _to_int_or_none(cid)
+    if cid is None or _CONTROL_IDS.get(cid, frame) is not frame:
+        cid = _NEXT_CID
+    _note_control_id(cid)
+    if frame._cid == cid:
+        return
+    if _CONTROL_IDS.get(frame._cid) is frame:
+        del _CONTROL_IDS[frame._cid]
+    _CONTROL_IDS[cid] = frame
+    frame._cid = cid
+    _track_binding(frame)   # re-key its usage entries
+
+def _binding_slots(kind, handle):
+    """(channel, namespace, number) slots a live control occupies."""
+    if kind == "slider":
+        return _slots_for(handle["mode"].get(), handle["channel"].get(), (handle["control"].get(),))
+    if kind == "button":
+        return _slots_for(handle.mode.get(), handle.channel.get(), (handle.control.get(),))
+    return _slots_for(handle.mode.get(), handle.channel.get(), [bd.get("control") for bd in handle.button_data])
+
+def _record_slots(state):
+    """Same as _binding_slots for a control that only exists as a saved-state dict."""
+    if state.get("type") == "radio":
+        numbers = [bd.get("control") for bd in state.get("buttons", [])]
+    else:
+        numbers = (state.get("control"),)
+    return _slots_for(state.get("mode", "CC"), state.get("channel"), numbers)
+
+def _slots_for(mode, ch, numbers):
+    ch = _to_channel_int_or_none(ch)
+    if ch is None or not 1 <= ch <= 16 or mode not in SLOT_NAMESPACES:
+        return ()
+    if mode not in NUMBERED_NAMESPACES:
+        return ((ch, mode, 0),)
+    return tuple(sorted({(ch, mode, int(n)) for n in numbers
+                         if not _is_unassigned_cc(n) and 0 <= int(n) <= 127}))
+
+def _claim_slots(frame, slots):
+    old_cid, old = _BINDINGS.get(frame, (None, ()))
+    cid = frame._cid
+    if old == slots and old_cid == cid:
+        return
+    for ch, ns, n in old:
+        used = _CC_USAGE[(ch, ns)]
+        used[n].remove(old_cid)
+        if not used[n]:
+            del used[n]
+            _CC_BITS[(ch, ns)] &= ~(1 << n)
+    for ch, ns, n in slots:
+        _CC_USAGE.setdefault((ch, ns), {}).setdefault(n, []).append(cid)
+        _CC_BITS[(ch, ns)] = _CC_BITS.get((ch, ns), 0) | 1 << n
+    if slots:
+        _BINDINGS[frame] = (cid, slots)
+    else:
+        _BINDINGS.pop(frame, None)
+    changed = set(old).symmetric_difference(slots) if old_cid == cid else set(old) | set(slots)
+    for listener in list(_USAGE_LISTENERS):
+        listener(changed)
+
+class _RecordBinding:
+    """Stands in for the frame in the slot map while a control is an off-screen record."""
+    __slots__ = ("_cid",)
+    def __init__(self, cid=None):
+        self._cid = cid
+
+def _track_binding(frame):
+    """Re-read one control's binding into the slot map (trace callback)."""
+    watched = _WATCHED.get(frame)
+    if watched is not None:
+        _claim_slots(frame, _binding_slots(*watched))
+        _journal_touch(frame)
+
+def _watch_bindings(kind, handle, frame, cid=None):
+    """Register a new control (id `cid` if free) and keep its slots current from var traces."""
+    _WATCHED[frame] = (kind, handle)
+    _set_control_id(frame, cid)
+    if kind == "slider":
+        watched_vars = (handle["mode"], handle["channel"], handle["control"])
+    elif kind == "button":
+        watched_vars = (handle.mode, handle.channel, handle.control)
+    else:
+        watched_vars = (handle.mode, handle.channel)
+    for var in watched_vars:
+        var.trace_add("write", lambda *_: _track_binding(frame))
+    if kind != "radio":
+        name_var = handle["name"] if kind == "slider" else handle.name
+        name_var.trace_add("write", lambda *_: _journal_touch(frame))
+    _track_binding(frame)
+
+def _unwatch_bindings(frame):
+    if _WATCHED.pop(frame, None) is not None:
+        _claim_slots(frame, ())
+        _journal_removed(frame._cid)
+    if _CONTROL_IDS.get(frame._cid) is frame:
+        del _CONTROL_IDS[frame._cid]
+
+def _next_free_cc_across_channels(start_channel: int = 1, namespace: str = "CC"):
     """
-    Find next available (channel, cc), scanning start_channel..16 then 1..start_channel-1,
-    skipping Channel Mode CCs (120–127).
+    Find next available (channel, number) in `namespace`, scanning start_channel..16
+    then 1..start_channel-1; CC skips Channel Mode CCs (120–127).
     """
     try:
         start_channel = int(start_channel)
@@ -989,14 +1512,12 @@ def _next_free_cc_across_channels(start_channel: int = 1):
         start_channel = 1
     start_channel = max(1, min(16, start_channel))
 
+    mask = _assignable_mask(namespace)
     for off in range(16):
         ch = ((start_channel - 1 + off) % 16) + 1
-        used = _collect_used_cc_for_channel(ch)
-        for cc in range(128):
-            if cc in RESERVED_CCS:
-                continue
-            if cc not in used:
-                return ch, cc
+        free = mask & ~_CC_BITS.get((ch, namespace), 0)
+        if free:
+            return ch, (free & -free).bit_length() - 1   # lowest free number
     return None, None
 
 def _next_free_cc(used: set):
@@ -1027,11 +1548,13 @@ def add_radio_group(state=None):
         wdg.bind("<Button-3>", lambda e, rg=radio_group: rg.show_context_menu(e))
 
     radio_groups.append({"frame": frame, "group": radio_group})
+    _watch_bindings("radio", radio_group, frame, state.get("id") if state else None)
 
     # If the group is inside a group box, try assigning missing CCs now
     _maybe_assign_for_containing_group_box(frame)
 
     schedule_scroll_update()
+    return radio_group
 
 
 def add_slider(state=None):
@@ -1082,16 +1605,15 @@ def add_slider(state=None):
     )
     val_slider.grid(row=2, column=0, sticky="nsew", padx=0, pady=0)
 
-    if state and "value" in state:
-        try:
-            val_slider.set(int(state["value"]))
-        except Exception:
-            pass
-
     def update_val(val, ch=channel_var, ctrl=control_var, mode=mode_var):
         value_var.set(val)
         if UPDATING_FROM_MIDI:
             return
+        quiet = slider_entry.get("quiet")
+        if quiet is not None:
+            slider_entry["quiet"] = None
+            if int(float(val)) == quiet:
+                return   # the programmatic move, not the user
         send_midi(val, ch, ctrl, mode)
 
     val_slider.config(command=update_val)
@@ -1105,10 +1627,20 @@ def add_slider(state=None):
         "control": control_var,
         "name": name_var,
         "name_entry": name_entry,
+        "value_label": value_label,
+        # frame border + container padding on both sides
+        "inset": 2 * (int(frame.cget("bd")) + 4),
     }
     # backref for resize logic
     val_slider._slider_entry_ref = slider_entry
+    frame._slider_entry = slider_entry
     sliders.append(slider_entry)
+    if state and "value" in state:
+        try:
+            _set_slider_quietly(slider_entry, state["value"])
+        except Exception:
+            pass
+    _watch_bindings("slider", slider_entry, frame, state.get("id") if state else None)
 
     # Context menu on right click
     for wdg in (frame, container, name_entry, value_label, val_slider):
@@ -1141,6 +1673,7 @@ def add_midi_button(state=None):
     button.pack(fill="both", expand=True, padx=4, pady=4)
 
     buttons.append(button)
+    _watch_bindings("button", button, frame, state.get("id") if state else None)
 
     frame.bind("<Button-3>", lambda e, b=button: b.show_context_menu(e))
 
@@ -1148,6 +1681,7 @@ def add_midi_button(state=None):
     _maybe_assign_for_containing_group_box(frame)
 
     schedule_scroll_update()
+    return button
 
 
 def duplicate(widget):
@@ -1188,14 +1722,171 @@ def duplicate(widget):
         resize_slider(sliders[-1])
 
 
+# ---------------- Generic control access ----------------
+# Sliders are dicts, buttons are MidiButtonFrame, radios are MidiRadioGroupFrame;
+# these helpers let batch code treat them uniformly as (kind, handle, frame).
+def _live_controls():
+    for entry in sliders:
+        yield "slider", entry, entry["frame"]
+    for btn in buttons:
+        yield "button", btn, btn.master
+    for rg in radio_groups:
+        yield "radio", rg["group"], rg["frame"]
+
+def _control_state(kind, handle):
+    """Saved-state dict (with "type") for a live control."""
+    if kind == "slider":
+        st = slider_state(handle)
+    else:
+        st = copy.deepcopy(handle.get_state())
+    st["type"] = kind
+    return st
+
+def _spawn_control(state):
+    """Create a control from a saved-state dict and return its handle."""
+    kind = state.get("type")
+    if kind == "slider":
+        return add_slider(state)
+    if kind == "button":
+        return add_midi_button(state)
+    if kind == "radio":
+        return add_radio_group(state)
+    return None
+
+def _remove_control(kind, handle):
+    if kind == "slider":
+        remove_slider(handle)
+    elif kind == "button":
+        remove_button(handle)
+    elif kind == "radio":
+        remove_radio_group_by_group(handle)
+
+def _apply_state(kind, handle, state):
+    """Reconfigure an existing control in place from a saved-state dict."""
+    if kind == "slider":
+        frame = handle["frame"]
+    else:
+        frame = handle.master
+    frame.place(x=state.get("x", 10), y=state.get("y", 10),
+                width=state.get("width", DEFAULT_WIDTH), height=state.get("height", DEFAULT_HEIGHT_SLIDER))
+    _set_control_id(frame, state.get("id"))
+
+    if kind == "slider":
+        handle["name"].set(state.get("name", "Slider"))
+        handle["mode"].set(state.get("mode", "CC"))
+        handle["channel"].set(str(state.get("channel", 1)))
+        handle["control"].set(_to_str_or_empty(state.get("control")))
+        _set_slider_quietly(handle, state.get("value", 0))
+        resize_slider(handle)
+    elif kind == "button":
+        handle.name.set(state.get("name", "?"))
+        handle.mode.set(state.get("mode", "CC"))
+        handle.channel.set(str(state.get("channel", 1)))
+        handle.control.set(_to_str_or_empty(state.get("control")))
+        handle.latch_mode.set(bool(state.get("latch", False)))
+        handle.latched = bool(state.get("latched", False))
+        on = handle.latch_mode.get() and handle.latched
+        handle.button.config(bg=COL_BTN_LATCHED if on else COL_BTN_DEFAULT,
+                             activebackground=COL_BTN_LATCHED if on else COL_BTN_DEFAULT, relief="flat")
+    elif kind == "radio":
+        handle.mode.set(state.get("mode", "CC"))
+        handle.channel.set(str(state.get("channel", 1)))
+        handle.orientation.set(state.get("orientation", "vertical"))
+        handle.button_data = [
+            {"label": b.get("label", f"{i+1}"), "control": _to_int_or_none(b.get("control")),
+             "value": int(b.get("value", 0))}
+            for i, b in enumerate(state.get("buttons", []))
+        ]
+        handle.rebuild_controls()
+        handle.selected.set(int(state.get("selected", 0)))
+
+# ---------------- Spatial index ----------------
+class SpatialGrid:
+    """Uniform-grid index of rectangles so hit tests only look at nearby frames."""
+    def __init__(self, cell=SPATIAL_CELL):
+        self.cell = max(1, int(cell))
+        self._cells = {}   # (col, row) -> {obj: None}
+        self._rects = {}   # obj -> (x1, y1, x2, y2)
+
+    def _span(self, rect):
+        x1, y1, x2, y2 = rect
+        c = self.cell
+        for col in range(int(x1) // c, int(x2) // c + 1):
+            for row in range(int(y1) // c, int(y2) // c + 1):
+                yield (col, row)
+
+    def __len__(self):
+        return len(self._rects)
+
+    def __contains__(self, obj):
+        return obj in self._rects
+
+    def rect(self, obj):
+        return self._rects.get(obj)
+
+    def items(self):
+        return self._rects.items()
+
+    def update(self, obj, rect):
+        old = self._rects.get(obj)
+        if old == rect:
+            return
+        if old is not None:
+            self.remove(obj)
+        self._rects[obj] = rect
+        for key in self._span(rect):
+            self._cells.setdefault(key, {})[obj] = None
+
+    def remove(self, obj):
+        old = self._rects.pop(obj, None)
+        if old is None:
+            return
+        for key in self._span(old):
+            bucket = self._cells.get(key)
+            if bucket is not None:
+                bucket.pop(obj, None)
+                if not bucket:
+                    del self._cells[key]
+
+    def query_rect(self, rect):
+        """Objects whose rectangle overlaps rect (edges inclusive)."""
+        qx1, qy1, qx2, qy2 = rect
+        seen = {}
+        for key in self._span(rect):
+            for obj in self._cells.get(key, ()):
+                if obj in seen:
+                    continue
+                x1, y1, x2, y2 = self._rects[obj]
+                if x1 <= qx2 and qx1 <= x2 and y1 <= qy2 and qy1 <= y2:
+                    seen[obj] = None
+        return list(seen)
+
+    def query_point(self, px, py):
+        return self.query_rect((px, py, px, py))
+
+# Controls (sliders/buttons/radios) and group boxes are indexed separately
+CONTROL_INDEX = SpatialGrid()
+GROUP_INDEX = SpatialGrid()
+
+def _index_for_drf(drf):
+    return GROUP_INDEX if getattr(drf, "is_group_box", False) else CONTROL_INDEX
+
+def _by_creation(frames):
+    """Keep the old winfo_children() ordering (creation order) for index results."""
+    return sorted(frames, key=lambda f: getattr(f, "_seq", 0))
+
 def _drf_bbox(drf):
-    drf.update_idletasks()
-    x, y = drf.winfo_x(), drf.winfo_y()
-    return x, y, x + drf.winfo_width(), y + drf.winfo_height()
+    """Rectangle from the frame's geometry cache (no layout flush)."""
+    g = drf._geom
+    x, y = g["x"], g["y"]
+    return x, y, x + g["width"], y + g["height"]
 
-def _rect_contains_point(rect, px, py):
+def _rect_center(rect):
     x1, y1, x2, y2 = rect
-    return (x1 <= px <= x2) and (y1 <= py <= y2)
+    return (x1 + x2) // 2, (y1 + y2) // 2
+
+def _rects_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
 
 def _identify_widget_for_drf(drf):
     # 1) Direct children that are custom widgets
@@ -1218,21 +1909,88 @@ def _identify_widget_for_drf(drf):
 
     return (None, None)
 
-def _iter_member_frames():
-    for child in scrollable_frame.winfo_children():
-        if isinstance(child, DraggableResizableFrame) and not getattr(child, "is_group_box", False):
-            yield child
+# ---------------- Group membership tree ----------------
+# Group boxes nest: each box records the innermost box enclosing its centre in
+# `parent_box` (and its own `child_boxes`), and each control frame records its
+# innermost box in `_owner_box`. A box's `members` are the controls it owns
+# directly; nested boxes own theirs. Moves and resizes only re-resolve the
+# frames centred in the rectangles that were touched.
+def _box_rank(gb):
+    """Outer boxes rank higher: larger area first, then earlier creation."""
+    g = gb._geom
+    return (g["width"] * g["height"], -gb._seq)
+
+def _innermost_box_at(px, py, above=None):
+    """Smallest group box containing (px, py); with `above`, only boxes ranking over it."""
+    floor = _box_rank(above) if above is not None else None
+    best = best_rank = None
+    for gb in GROUP_INDEX.query_point(px, py):
+        rank = _box_rank(gb)
+        if floor is not None and rank <= floor:
+            continue
+        if best is None or rank < best_rank:
+            best, best_rank = gb, rank
+    return best
+
+def _set_owner(drf, box, assign=True):
+    """Make `box` (or no box) the owner of a control frame. True if it changed."""
+    old = drf._owner_box
+    if old is box:
+        return False
+    if old is not None and drf in old.members:
+        old.members.remove(drf)
+    drf._owner_box = box
+    if box is not None:
+        box.members = _by_creation(box.members + [drf])
+        if assign:
+            box.apply_channel_to_members([drf])
+            if box.auto_assign_ccs.get():
+                box._assign_missing_ccs_from_first_free([drf])
+    return True
+
+def _set_parent(gb, parent, assign=True):
+    """Re-hang a group box under `parent` (or at top level). True if it changed."""
+    old = gb.parent_box
+    if old is parent:
+        return False
+    if old is not None and gb in old.child_boxes:
+        old.child_boxes.remove(gb)
+    gb.parent_box = parent
+    if parent is not None:
+        parent.child_boxes = _by_creation(parent.child_boxes + [gb])
+    gb._restack()
+    if gb.channel is None:
+        gb._propagate_channel(assign)   # inherited channel may have changed
+    return True
+
+def _relink_region(rects, assign=True):
+    """Re-resolve parent boxes and owners for everything overlapping `rects`."""
+    boxes, controls = {}, {}
+    for rect in rects:
+        boxes.update(dict.fromkeys(GROUP_INDEX.query_rect(rect)))
+        controls.update(dict.fromkeys(CONTROL_INDEX.query_rect(rect)))
+    # outer boxes first so inherited channels resolve top-down
+    for gb in sorted(boxes, key=_box_rank, reverse=True):
+        _set_parent(gb, _innermost_box_at(*_rect_center(_drf_bbox(gb)), above=gb), assign)
+    for drf in _by_creation(controls):
+        _set_owner(drf, _innermost_box_at(*_rect_center(_drf_bbox(drf))), assign)
+
+def _update_memberships_after_move(drf, old_rect):
+    """Re-resolve only what drf's move could affect."""
+    try:
+        if getattr(drf, "is_group_box", False):
+            _relink_region([old_rect, _drf_bbox(drf)])
+        else:
+            _set_owner(drf, _innermost_box_at(*_rect_center(_drf_bbox(drf))))
+    except Exception as e:
+        print("Membership update failed:", e)
 
 def _maybe_assign_for_containing_group_box(drf):
-    """If this widget frame lives inside any group box, trigger assignment there."""
-    for gb in group_boxes:
-        gx1, gy1, gx2, gy2 = _drf_bbox(gb)
-        x1, y1, x2, y2 = _drf_bbox(drf)
-        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-        if _rect_contains_point((gx1, gy1, gx2, gy2), cx, cy):
-            gb.compute_members()  # this will apply channel & assign missing CCs
-            gb._redraw()
-            break
+    """Hand a new widget frame to its innermost group box (which applies channel/CCs)."""
+    if TRUST_SAVED_GROUPS:
+        return
+    box = _innermost_box_at(*_rect_center(_drf_bbox(drf)))
+    _set_owner(drf, box, assign=not DEFER_GROUP_ASSIGN)
 
 # ---------------- Draggable/Resizable container ----------------
 class DraggableResizableFrame(tk.Frame):
@@ -1240,6 +1998,12 @@ class DraggableResizableFrame(tk.Frame):
         super().__init__(parent, **kwargs)
 
         DRF_INSTANCES.append(self)
+        self._seq = next(_DRF_SEQ)
+        # last placed geometry; read this instead of winfo_*/place_info()
+        self._geom = {"x": 0, "y": 0, "width": 0, "height": 0}
+        self._slider_entry = None   # set by add_slider() so resize needn't search children
+        self._owner_box = None      # innermost GroupBoxFrame containing this frame
+        self._cid = None            # persistent control id (controls only, see _set_control_id)
 
         self._drag_data = {"x": 0, "y": 0}
         self._resize_data = {
@@ -1247,22 +2011,16 @@ class DraggableResizableFrame(tk.Frame):
             "x": 0, "y": 0, "w": 0, "h": 0, "absx": 0, "absy": 0
         }
 
-        self.grips = {
-            "nw": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="top_left_corner"),
-            "ne": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="top_right_corner"),
-            "se": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="bottom_right_corner"),
-            "sw": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="bottom_left_corner"),
-        }
-        for corner in ("nw", "ne", "se", "sw"):
-            self.grips[corner].bind("<ButtonPress-1>", lambda e, c=corner: self.start_resize(e, c))
-            self.grips[corner].bind("<B1-Motion>", self.do_resize)
-            self.grips[corner].bind("<ButtonRelease-1>", self.stop_resize)
-
-        self.update_grips()
+        # Grip Labels are created on first use (see _ensure_grips); frames that are
+        # never hovered in edit mode never pay for them.
+        self.grips = {}
+        self._grips_shown = False
 
         self.bind("<Button-1>", self.start_drag)
         self.bind("<B1-Motion>", self.do_drag)
         self.bind("<ButtonRelease-1>", self.snap_to_grid)
+        self.bind("<Shift-Button-1>", self.toggle_selected)
+        self.bind("<Enter>", self._on_hover, add="+")
 
     def destroy(self):
         try:
@@ -1270,9 +2028,64 @@ class DraggableResizableFrame(tk.Frame):
                 DRF_INSTANCES.remove(self)
         except Exception:
             pass
+        if self in SELECTION:
+            SELECTION.remove(self)
+        if GRIP_HOST["frame"] is self:
+            GRIP_HOST["frame"] = None
+        if self._owner_box is not None and self in self._owner_box.members:
+            self._owner_box.members.remove(self)
+        _unwatch_bindings(self)
+        _index_for_drf(self).remove(self)
+        _extents_on_remove(self)
         super().destroy()
 
+    def place(self, cnf={}, **kw):
+        """place() that records the geometry cache and keeps the spatial index current."""
+        super().place_configure(cnf, **kw)
+        opts = dict(cnf, **kw) if cnf else kw
+        for key in ("x", "y", "width", "height"):
+            if key in opts:
+                try:
+                    self._geom[key] = int(opts[key])
+                except (TypeError, ValueError):
+                    pass
+        self._reindex()
+
+    place_configure = place
+
+    def _reindex(self):
+        rect = _drf_bbox(self)
+        _index_for_drf(self).update(self, rect)
+        _extents_on_place(self, rect)
+        _journal_touch(self)
+
+    def _on_hover(self, event=None):
+        if not locked.get():
+            set_grip_host(self)
+
+    def _ensure_grips(self):
+        if self.grips:
+            return
+        self.grips = {
+            "nw": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="top_left_corner"),
+            "ne": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="top_right_corner"),
+            "se": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="bottom_right_corner"),
+            "sw": tk.Label(self, bg=COL_ACCENT, width=1, height=1, cursor="bottom_left_corner"),
+        }
+        for corner in ("nw", "ne", "se", "sw"):
+            self.grips[corner].bind("<ButtonPress-1>", lambda e, c=corner: self.start_resize(e, c))
+            self.grips[corner].bind("<B1-Motion>", self.do_resize)
+            self.grips[corner].bind("<ButtonRelease-1>", self.stop_resize)
+
     def update_grips(self):
+        """Show grips only while unlocked and this frame is hovered or selected."""
+        want = (not locked.get()) and (GRIP_HOST["frame"] is self or self in SELECTION)
+        if want == self._grips_shown:
+            return
+        self._grips_shown = want
+        if want:
+            self._ensure_grips()
+
         for g in list(self.grips.values()):
             try:
                 if g.winfo_exists():
@@ -1280,7 +2093,7 @@ class DraggableResizableFrame(tk.Frame):
             except Exception:
                 pass
 
-        if not locked.get():
+        if want:
             size = 10
             try:
                 if self.grips["nw"].winfo_exists():
@@ -1300,37 +2113,46 @@ class DraggableResizableFrame(tk.Frame):
             except Exception:
                 pass
 
+    def toggle_selected(self, event=None):
+        if locked.get() or getattr(self, "is_group_box", False):
+            return
+        set_selected(self, self not in SELECTION)
+
     def start_drag(self, event):
         if locked.get() or self._resize_data["active"]:
             return
-        self._drag_data["x"] = event.x
-        self._drag_data["y"] = event.y
+        if self in SELECTION and len(SELECTION) > 1:
+            _begin_selection_drag(event)
+            return
+        self._drag_data["x"] = event.x_root - self._geom["x"]
+        self._drag_data["y"] = event.y_root - self._geom["y"]
+        self._drag_from = _drf_bbox(self)
+        DRAG.begin(self._drag_to)
+
+    def _drag_to(self, x_root, y_root):
+        self.place(x=x_root - self._drag_data["x"], y=y_root - self._drag_data["y"])
 
     def do_drag(self, event):
         if locked.get() or self._resize_data["active"]:
             return
-        dx = event.x - self._drag_data["x"]
-        dy = event.y - self._drag_data["y"]
-        x = self.winfo_x() + dx
-        y = self.winfo_y() + dy
-        self.place(x=x, y=y)
-        schedule_scroll_update()
+        DRAG.push(event)
 
     def snap_to_grid(self, event):
         if self._resize_data["active"]:
             return
-        x = round(self.winfo_x() / GRID_SIZE) * GRID_SIZE
-        y = round(self.winfo_y() / GRID_SIZE) * GRID_SIZE
+        DRAG.finish(event)
+        if _SEL_DRAG["active"]:
+            _end_selection_drag()
+            return
+        x = round(self._geom["x"] / GRID_SIZE) * GRID_SIZE
+        y = round(self._geom["y"] / GRID_SIZE) * GRID_SIZE
         self.place(x=x, y=y)
         schedule_scroll_update()
 
-        # NEW: refresh group memberships after any widget finishes moving
-        try:
-            for gb in group_boxes:
-                gb.compute_members()
-                gb._redraw()
-        except Exception:
-            pass
+        # refresh only the group boxes this widget left or entered
+        old_rect = getattr(self, "_drag_from", None) or _drf_bbox(self)
+        self._drag_from = None
+        _update_memberships_after_move(self, old_rect)
 
     def start_resize(self, event, corner):
         if locked.get():
@@ -1338,16 +2160,21 @@ class DraggableResizableFrame(tk.Frame):
         _begin_suppression()  # smoother while any DRF is resizing
         self._resize_data.update({
             "active": True, "corner": corner, "x": event.x_root, "y": event.y_root,
-            "w": self.winfo_width(), "h": self.winfo_height(),
-            "absx": self.winfo_x(), "absy": self.winfo_y(),
+            "w": self._geom["width"], "h": self._geom["height"],
+            "absx": self._geom["x"], "absy": self._geom["y"],
         })
+        self._drag_from = _drf_bbox(self)
+        DRAG.begin(self._resize_to)
 
     def do_resize(self, event):
-        rd = self._resize_data
-        if not rd["active"]:
+        if not self._resize_data["active"]:
             return
-        dx = event.x_root - rd["x"]
-        dy = event.y_root - rd["y"]
+        DRAG.push(event)
+
+    def _resize_to(self, x_root, y_root):
+        rd = self._resize_data
+        dx = x_root - rd["x"]
+        dy = y_root - rd["y"]
 
         new_x, new_y = rd["absx"], rd["absy"]
         new_w, new_h = rd["w"], rd["h"]
@@ -1368,20 +2195,136 @@ class DraggableResizableFrame(tk.Frame):
         new_y = round(new_y / GRID_SIZE) * GRID_SIZE
 
         self.place(x=new_x, y=new_y, width=new_w, height=new_h)
-        schedule_scroll_update()
 
         # Resize-aware children (sliders)
-        for widget in self.winfo_children():
-            if isinstance(widget, tk.Frame):
-                for sub in widget.winfo_children():
-                    if isinstance(sub, tk.Scale) and hasattr(sub, "_slider_entry_ref"):
-                        resize_slider(sub._slider_entry_ref)
+        if self._slider_entry is not None:
+            resize_slider(self._slider_entry)
 
     def stop_resize(self, event):
+        if self._resize_data["active"]:
+            DRAG.finish(event)
+            _end_suppression()   # paired with start_resize, which a locked layout skips
         self._resize_data["active"] = False
-        _end_suppression()
         schedule_scroll_update()
+        old_rect = getattr(self, "_drag_from", None) or _drf_bbox(self)
+        self._drag_from = None
+        _update_memberships_after_move(self, old_rect)
+
+
+# ---------------- Multi-selection ----------------
+# Shift-click toggles a frame; dragging on the empty background draws a
+# rubber band (Shift+drag adds to the current selection). Dragging any
+# selected frame moves the whole selection by one offset.
+SELECTION = []   # selected DraggableResizableFrames, in selection order
+_SEL_DRAG = {"active": False, "x": 0, "y": 0, "dx": 0, "dy": 0, "starts": {}}
+_BAND = {"active": False, "x": 0, "y": 0, "additive": False, "edges": None}
+
+def set_selected(drf, on):
+    if on and drf not in SELECTION:
+        SELECTION.append(drf)
+        drf.config(bg=COL_ACCENT)   # shows through the 4px padding around the control
+        drf.update_grips()
+    elif not on and drf in SELECTION:
+        SELECTION.remove(drf)
+        try:
+            drf.config(bg=COL_FRAME)
+            drf.update_grips()
+        except Exception:
+            pass
 
+# Edit-mode grips are only placed on the hovered frame and the selection, so
+# toggling the lock touches a handful of frames however large the layout is.
+GRIP_HOST = {"frame": None}
+
+def set_grip_host(drf):
+    old = GRIP_HOST["frame"]
+    if old is drf:
+        return
+    GRIP_HOST["frame"] = drf
+    if old is not None:
+        try:
+            old.update_grips()
+        except tk.TclError:
+            pass
+    if drf is not None:
+        drf.update_grips()
+
+def clear_selection():
+    for drf in list(SELECTION):
+        set_selected(drf, False)
+
+def _begin_selection_drag(event):
+    _begin_suppression()
+    _SEL_DRAG.update(active=True, x=event.x_root, y=event.y_root, dx=0, dy=0,
+                     starts={d: (d._geom["x"], d._geom["y"]) for d in SELECTION})
+    DRAG.begin(_drag_selection_to)
+
+def _drag_selection_to(x_root, y_root):
+    """Apply one offset to every selected frame in a single pass."""
+    dx = _SEL_DRAG["dx"] = x_root - _SEL_DRAG["x"]
+    dy = _SEL_DRAG["dy"] = y_root - _SEL_DRAG["y"]
+    for drf, (sx, sy) in _SEL_DRAG["starts"].items():
+        drf.place(x=sx + dx, y=sy + dy)
+
+def _end_selection_drag():
+    _SEL_DRAG["active"] = False
+    dx = round(_SEL_DRAG["dx"] / GRID_SIZE) * GRID_SIZE
+    dy = round(_SEL_DRAG["dy"] / GRID_SIZE) * GRID_SIZE
+    starts, _SEL_DRAG["starts"] = _SEL_DRAG["starts"], {}
+    for drf, (sx, sy) in starts.items():
+        try:
+            drf.place(x=sx + dx, y=sy + dy)
+        except tk.TclError:
+            pass
+    _end_suppression()
+    for drf, (sx, sy) in starts.items():
+        g = drf._geom
+        _update_memberships_after_move(drf, (sx, sy, sx + g["width"], sy + g["height"]))
+
+def _band_edges():
+    if _BAND["edges"] is None:
+        _BAND["edges"] = [tk.Frame(scrollable_frame, bg=COL_ACCENT) for _ in range(4)]
+    return _BAND["edges"]
+
+def _band_rect(event):
+    x1, x2 = sorted((_BAND["x"], event.x))
+    y1, y2 = sorted((_BAND["y"], event.y))
+    return x1, y1, x2, y2
+
+def _band_press(event):
+    if locked.get() or event.widget is not scrollable_frame:
+        return
+    _BAND.update(active=True, x=event.x, y=event.y, additive=bool(event.state & 0x0001))
+
+def _band_motion(event):
+    if not _BAND["active"]:
+        return
+    x1, y1, x2, y2 = _band_rect(event)
+    top, bottom, left, right = _band_edges()
+    top.place(x=x1, y=y1, width=x2 - x1 + 1, height=1)
+    bottom.place(x=x1, y=y2, width=x2 - x1 + 1, height=1)
+    left.place(x=x1, y=y1, width=1, height=y2 - y1 + 1)
+    right.place(x=x2, y=y1, width=1, height=y2 - y1 + 1)
+    for edge in (top, bottom, left, right):
+        edge.lift()
+
+def _band_release(event):
+    if not _BAND["active"]:
+        return
+    _BAND["active"] = False
+    for edge in _band_edges():
+        edge.place_forget()
+    if not _BAND["additive"]:
+        clear_selection()
+    x1, y1, x2, y2 = _band_rect(event)
+    if (x2 - x1) < 3 and (y2 - y1) < 3:
+        return  # plain click on the background
+    for drf in _by_creation(CONTROL_INDEX.query_rect((x1, y1, x2, y2))):
+        set_selected(drf, True)
+
+scrollable_frame.bind("<Button-1>", _band_press)
+scrollable_frame.bind("<B1-Motion>", _band_motion)
+scrollable_frame.bind("<ButtonRelease-1>", _band_release)
 
 # ---------------- Group Box ----------------
 def remove_button(button_frame):
@@ -1412,7 +2355,8 @@ def remove_radio_group_by_group(group_widget):
 
 class GroupBoxFrame(DraggableResizableFrame):
     """A lasso-like box that groups widgets whose centers lie inside it.
-       Always kept under other controls."""
+       Boxes nest (innermost box owns a widget); a box with channel None
+       inherits its parent's. Always kept under other controls."""
     def __init__(self, parent, title="Group", state=None, **kwargs):
         kwargs.pop("title", None)
         super().__init__(parent, **kwargs)
@@ -1420,9 +2364,10 @@ class GroupBoxFrame(DraggableResizableFrame):
 
         group_title = state.get("title", title) if state else title
         self.title   = tk.StringVar(value=group_title)
-        self.channel = state.get("channel", 1) if state else 1
-        self.members = []
-        self._last_motion_ts = 0.0
+        self.channel = state.get("channel", 1) if state else 1   # None = inherit
+        self.members = []       # controls owned directly (not via nested boxes)
+        self.parent_box = None
+        self.child_boxes = []
 
         initial_lock = bool(state.get("lock_ccs", False)) if state else False
         self.auto_assign_ccs = tk.BooleanVar(value=not initial_lock)
@@ -1446,78 +2391,130 @@ class GroupBoxFrame(DraggableResizableFrame):
             src.bind("<Button-3>", self._show_menu)
 
         self.bind("<Configure>", lambda e: self._redraw())
-        self.compute_members()
         self._redraw()
-        try: self.lower()
-        except Exception: pass
+        self._restack()
+
+    def effective_channel(self):
+        """Own channel, or the nearest ancestor's when this box inherits."""
+        gb = self
+        while gb is not None:
+            if gb.channel is not None:
+                return gb.channel
+            gb = gb.parent_box
+        return 1
 
     def update_channel_label(self):
+        _journal_touch(self)
         lock_txt = " (locked)" if self._lock_var.get() else ""
-        self._title_label_var.set(f"{self.title.get()} — Ch {self.channel}{lock_txt}")
+        inh_txt = " (inherited)" if self.channel is None and self.parent_box is not None else ""
+        self._title_label_var.set(f"{self.title.get()} — Ch {self.effective_channel()}{inh_txt}{lock_txt}")
+
+    def _propagate_channel(self, assign=True):
+        """Re-apply the effective channel here and in every inheriting descendant."""
+        self.update_channel_label()
+        if assign:
+            self.apply_channel_to_members()
+            if self.auto_assign_ccs.get():
+                self._assign_missing_ccs_from_first_free()
+        for child in self.child_boxes:
+            if child.channel is None:
+                child._propagate_channel(assign)
+
+    def subtree(self):
+        """(boxes, controls) of this box and everything nested in it."""
+        boxes, controls = [], []
+        stack = [self]
+        while stack:
+            gb = stack.pop()
+            boxes.append(gb)
+            controls.extend(gb.members)
+            stack.extend(gb.child_boxes)
+        return boxes, controls
+
+    def _restack(self):
+        """Keep this box under the controls but above the boxes enclosing it."""
+        gb = self
+        while gb is not None:
+            try: gb.lower()
+            except Exception: pass
+            gb = gb.parent_box
+
+    def destroy(self):
+        rect = _drf_bbox(self)
+        _journal_touch(self)   # the flush runs later and writes group_boxes without this box
+        if self.parent_box is not None and self in self.parent_box.child_boxes:
+            self.parent_box.child_boxes.remove(self)
+        super().destroy()
+        if TRUST_SAVED_GROUPS or DEFER_GROUP_ASSIGN:
+            return   # the caller restores or relinks memberships itself
+        try:
+            _relink_region([rect])   # orphans fall back to the enclosing box
+        except Exception as e:
+            print("Membership update failed:", e)
 
     def _redraw(self):
         self._cnv.delete("all")
-        w = max(1, self.winfo_width() - 1)
-        h = max(1, self.winfo_height() - 1)
+        w = max(1, self._geom["width"] - 1)
+        h = max(1, self._geom["height"] - 1)
         self._cnv.create_rectangle(1, 1, w, h, outline=COL_ACCENT, width=2, dash=(5, 4))
         try: self._title.lift()
         except Exception: pass
 
     def update_grips(self):
         super().update_grips()
-        try: self.lower()
-        except Exception: pass
+        self._restack()
+
+    def collect_members(self):
+        """Re-resolve ownership in and around this box without touching bindings."""
+        _relink_region([_drf_bbox(self)] + [_drf_bbox(m) for m in self.members], assign=False)
 
     def compute_members(self):
-        gx1, gy1, gx2, gy2 = _drf_bbox(self)
-        self.members = []
-        for drf in _iter_member_frames():
-            x1, y1, x2, y2 = _drf_bbox(drf)
-            cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-            if _rect_contains_point((gx1, gy1, gx2, gy2), cx, cy):
-                self.members.append(drf)
+        self.collect_members()
         self.apply_channel_to_members()
         if self.auto_assign_ccs.get():
             self._assign_missing_ccs_from_first_free()
 
-    def apply_channel_to_members(self):
-        for m in self.members:
+    def apply_channel_to_members(self, members=None):
+        channel = self.effective_channel()
+        for m in (self.members if members is None else members):
             wtype, payload = _identify_widget_for_drf(m)
             try:
                 if wtype == "slider" and "channel" in payload and "control" in payload:
                     if _is_unassigned_cc(payload["control"].get()) or _is_unassigned_ch(payload["channel"].get()):
-                        payload["channel"].set(str(self.channel))
+                        payload["channel"].set(str(channel))
                 elif wtype == "button":
                     if _is_unassigned_cc(payload.control.get()) or _is_unassigned_ch(payload.channel.get()):
-                        payload.channel.set(str(self.channel))
+                        payload.channel.set(str(channel))
                 elif wtype == "radio":
                     needs_ctrl = any(_is_unassigned_cc(b.get("control", None)) for b in payload.button_data)
                     if needs_ctrl or _is_unassigned_ch(payload.channel.get()):
-                        payload.channel.set(str(self.channel))
+                        payload.channel.set(str(channel))
             except Exception as e:
                 print(f"Failed to apply channel to {wtype}: {e}")
 
-    def _assign_missing_ccs_from_first_free(self):
+    def _assign_missing_ccs_from_first_free(self, members=None):
         """
-        Assign controls to any members that are missing them.
+        Assign controls to any members (or just `members`) that are missing them.
         If the current group channel is full, roll over to the next channel,
         set the member's channel accordingly, and continue.
         """
-        def _claim_slot():
-            base_ch = _to_ch_or_default(self.channel)
-            ch, cc = _next_free_cc_across_channels(base_ch)
+        if members is None:
+            members = self.members
+        def _claim_slot(mode):
+            base_ch = _to_ch_or_default(self.effective_channel())
+            ch, cc = _next_free_cc_across_channels(base_ch, mode)
             if ch is None:
                 return (None, None)
             return ch, cc
 
-        # sliders
-        for m in self.members:
+        # sliders (Pitch Bend/Aftertouch need no number, so they claim nothing)
+        for m in members:
             wtype, payload = _identify_widget_for_drf(m)
-            if wtype == "slider":
+            if wtype == "slider" and payload["mode"].get() in NUMBERED_NAMESPACES:
                 try:
                     ctrl_var = payload.get("control")
                     if _is_unassigned_cc(ctrl_var.get()):
-                        ch, cc = _claim_slot()
+                        ch, cc = _claim_slot(payload["mode"].get())
                         if ch is None:
                             print("No free CCs left on any channel."); return
                         payload["channel"].set(str(ch))
@@ -1526,12 +2523,12 @@ class GroupBoxFrame(DraggableResizableFrame):
                     print("Assign-missing CC (slider) failed:", e)
 
         # buttons
-        for m in self.members:
+        for m in members:
             wtype, payload = _identify_widget_for_drf(m)
-            if wtype == "button":
+            if wtype == "button" and payload.mode.get() in NUMBERED_NAMESPACES:
                 try:
                     if _is_unassigned_cc(payload.control.get()):
-                        ch, cc = _claim_slot()
+                        ch, cc = _claim_slot(payload.mode.get())
                         if ch is None:
                             print("No free CCs left on any channel."); return
                         payload.channel.set(str(ch))
@@ -1540,65 +2537,82 @@ class GroupBoxFrame(DraggableResizableFrame):
                     print("Assign-missing CC (button) failed:", e)
 
         # radios: same CC for all options; also set group channel to the chosen one
-        for m in self.members:
+        for m in members:
             wtype, payload = _identify_widget_for_drf(m)
-            if wtype == "radio":
+            if wtype == "radio" and payload.mode.get() in NUMBERED_NAMESPACES:
                 try:
                     btns = payload.button_data
                     needs = any(_is_unassigned_cc(b.get("control", None)) for b in btns)
                     if needs:
-                        ch, cc = _claim_slot()
+                        ch, cc = _claim_slot(payload.mode.get())
                         if ch is None:
                             print("No free CCs left on any channel."); return
                         payload.channel.set(str(ch))
                         for bd in btns:
                             bd["control"] = int(cc)
-                        payload.rebuild_controls()
-                        payload.update_visuals()
+                        payload.refresh_bindings()
                 except Exception as e:
                     print("Assign-missing CC (radio) failed:", e)
                     
     def _on_press(self, event):
         if locked.get() or getattr(self, "_resize_data", {}).get("active"): return
         _begin_suppression()
-        self._drag_data["x"] = event.x; self._drag_data["y"] = event.y
-        self._start_pos = (self.winfo_x(), self.winfo_y())
-        self._member_starts = {m: (m.winfo_x(), m.winfo_y()) for m in self.members}
-        self._last_motion_ts = 0.0
+        self._drag_data["x"] = event.x_root; self._drag_data["y"] = event.y_root
+        self._drag_from = _drf_bbox(self)
+        if VIRTUAL_LAYOUT is not None:
+            VIRTUAL_LAYOUT.materialize_box(self)   # unpinned in snap_to_grid
+        boxes, controls = self.subtree()
+        self._move_starts = {f: (f._geom["x"], f._geom["y"]) for f in boxes + controls}
+        DRAG.begin(self._drag_to)
+
+    def _drag_to(self, x_root, y_root):
+        """Move the box, nested boxes and all their members by one offset."""
+        off_x = x_root - self._drag_data["x"]; off_y = y_root - self._drag_data["y"]
+        for f, (fx, fy) in self._move_starts.items():
+            f.place(x=fx + off_x, y=fy + off_y)
 
     def do_drag(self, event):
         if locked.get() or getattr(self, "_resize_data", {}).get("active"): return
-        import time
-        now = time.time()
-        if (now - self._last_motion_ts) < 0.01: return
-        self._last_motion_ts = now
-        dx = event.x - self._drag_data["x"]; dy = event.y - self._drag_data["y"]
-        new_x = self.winfo_x() + dx; new_y = self.winfo_y() + dy
-        self.place(x=new_x, y=new_y)
-        off_x = new_x - self._start_pos[0]; off_y = new_y - self._start_pos[1]
-        for m, (mx, my) in self._member_starts.items():
-            m.place(x=mx + off_x, y=my + off_y)
+        DRAG.push(event)
 
     def snap_to_grid(self, event):
         if getattr(self, "_resize_data", {}).get("active"): return
-        gx = round(self.winfo_x() / GRID_SIZE) * GRID_SIZE
-        gy = round(self.winfo_y() / GRID_SIZE) * GRID_SIZE
-        dx = gx - self.winfo_x(); dy = gy - self.winfo_y()
-        self.place(x=gx, y=gy)
-        for m in self.members:
-            m.place(x=m.winfo_x() + dx, y=m.winfo_y() + dy)
-        _end_suppression()
-        self.compute_members(); self._redraw()
+        DRAG.finish(event)
+        gx = round(self._geom["x"] / GRID_SIZE) * GRID_SIZE
+        gy = round(self._geom["y"] / GRID_SIZE) * GRID_SIZE
+        dx = gx - self._geom["x"]; dy = gy - self._geom["y"]
+        moved, self._move_starts = getattr(self, "_move_starts", {}), {}
+        for f in moved or sum(self.subtree(), []):
+            f.place(x=f._geom["x"] + dx, y=f._geom["y"] + dy)
+        if moved:   # _on_press ran and began suppression
+            _end_suppression()
+        old_rect = getattr(self, "_drag_from", None) or _drf_bbox(self)
+        self._drag_from = None
+        _update_memberships_after_move(self, old_rect)
+        self._redraw()
+        if VIRTUAL_LAYOUT is not None:
+            VIRTUAL_LAYOUT.unpin(self)
 
     def stop_resize(self, event):
-        super().stop_resize(event)
-        self.compute_members(); self._redraw(); _end_suppression()
+        super().stop_resize(event)   # re-resolves the old and new area
+        self._redraw()
+
+    def _with_live_members(self, action):
+        """Run `action` with every off-screen record under this box made live first."""
+        if VIRTUAL_LAYOUT is None:
+            return action()
+        VIRTUAL_LAYOUT.materialize_box(self)
+        try:
+            return action()
+        finally:
+            if VIRTUAL_LAYOUT is not None:
+                VIRTUAL_LAYOUT.unpin(self)
 
     def _show_menu(self, event):
         menu = tk.Menu(self, tearoff=0, bg=COL_FRAME, fg=COL_TEXT, activebackground=COL_ACCENT, font=FONT_UI)
         menu.add_command(label="Rename Group", command=self._rename)
         menu.add_command(label="Edit Channel", command=self._edit_channel)
-        menu.add_command(label="Recompute Members", command=self.compute_members)
+        menu.add_command(label="Recompute Members", command=lambda: self._with_live_members(self.compute_members))
         menu.add_checkbutton(
             label="Lock CCs (stop auto-assign)",
             onvalue=True, offvalue=False,
@@ -1606,11 +2620,11 @@ class GroupBoxFrame(DraggableResizableFrame):
             command=self.update_channel_label
         )
         menu.add_command(label="Reassign Missing CCs Now",
-                         command=lambda: (self._assign_missing_ccs_from_first_free(), self._redraw()))
+                         command=lambda: (self._with_live_members(self._assign_missing_ccs_from_first_free), self._redraw()))
         menu.add_separator()
-        menu.add_command(label="Duplicate Box + Members", command=self.duplicate_group_box)
+        menu.add_command(label="Duplicate Box + Members", command=lambda: self._with_live_members(self.duplicate_group_box))
         menu.add_separator()
-        menu.add_command(label="Delete Groupbox and Contents", command=self.delete_group_and_contents)
+        menu.add_command(label="Delete Groupbox and Contents", command=lambda: self._with_live_members(self.delete_group_and_contents))
         menu.tk_popup(event.x_root, event.y_root)
         return "break"
 
@@ -1629,17 +2643,14 @@ class GroupBoxFrame(DraggableResizableFrame):
         win.geometry("240x120"); win.resizable(False, False)
         tk.Label(win, text="MIDI Channel", bg=COL_FRAME, fg=COL_TEXT, font=FONT_LABEL)\
             .grid(row=0, column=0, padx=12, pady=12, sticky="w")
-        ch_var = tk.StringVar(value=str(self.channel))
-        ttk.Combobox(win, textvariable=ch_var, values=[str(i) for i in range(1, 17)],
+        ch_var = tk.StringVar(value="Inherit" if self.channel is None else str(self.channel))
+        ttk.Combobox(win, textvariable=ch_var, values=["Inherit"] + [str(i) for i in range(1, 17)],
                      state="readonly", width=5)\
             .grid(row=0, column=1, padx=12, pady=12, sticky="w")
         def apply_and_close():
             try:
-                self.channel = int(ch_var.get())
-                self.apply_channel_to_members()
-                if self.auto_assign_ccs.get():
-                    self._assign_missing_ccs_from_first_free()
-                self.update_channel_label()
+                self.channel = None if ch_var.get() == "Inherit" else int(ch_var.get())
+                self._with_live_members(self._propagate_channel)
             finally:
                 win.destroy()
         tk.Button(win, text="Apply", command=apply_and_close,
@@ -1647,7 +2658,8 @@ class GroupBoxFrame(DraggableResizableFrame):
             .grid(row=1, column=0, columnspan=2, pady=(0, 12))
 
     def delete_group_and_contents(self):
-        self.compute_members()
+        for child in list(self.child_boxes):
+            child.delete_group_and_contents()
         for m in list(self.members):
             wtype, payload = _identify_widget_for_drf(m)
             if wtype == "slider":
@@ -1662,90 +2674,54 @@ class GroupBoxFrame(DraggableResizableFrame):
         schedule_scroll_update()
 
     def duplicate_group_box(self, offset_px=20):
-        """Duplicate this group box + all members.
-           New copy uses NEXT channel, preserves ALL CC/Note numbers."""
-        self.update_idletasks()
+        """Duplicate this group box + all members and nested boxes.
+           New copy uses NEXT channel, preserves ALL CC/Note numbers; nested boxes with
+           their own channel move to their own next channel, inheriting ones follow."""
         x1, y1, x2, y2 = _drf_bbox(self)
-        w, h = self.winfo_width(), self.winfo_height()
+        h = self._geom["height"]
         cy = (y1 + y2) // 2
-        new_x = x2 + offset_px
-        new_y = cy - h // 2
-
-        new_channel = self.channel + 1 if self.channel < 16 else 1
-
-        st = {
-            "type": "group_box",
-            "title": self.title.get(),
-            "x": new_x, "y": new_y,
-            "width": w, "height": h,
-            "channel": new_channel,
-            "lock_ccs": self._lock_var.get(),
-        }
-        new_gb = add_group_box(st)
-        new_gb.channel = new_channel
-        new_gb.update_channel_label()
-
-        original_lock = new_gb._lock_var.get()
-        try:
-            new_gb._lock_var.set(True)
-            new_gb.auto_assign_ccs.set(False)
+        dx = x2 + offset_px - self._geom["x"]
+        dy = cy - h // 2 - self._geom["y"]
 
-            dx = new_x - self.winfo_x()
-            dy = new_y - self.winfo_y()
-
-            self.compute_members()
-
-            for m in list(self.members):
-                wtype, payload = _identify_widget_for_drf(m)
+        ch = self.effective_channel()
+        new_gb = self._clone_subtree(dx, dy, ch % 16 + 1)
+        new_gb.compute_members()
+        schedule_scroll_update()
 
-                if wtype == "slider":
-                    ms = slider_state(payload)
-                    ms["x"], ms["y"] = m.winfo_x() + dx, m.winfo_y() + dy
-                    ms["channel"] = new_channel
-                    add_slider(ms)
+    def _clone_subtree(self, dx, dy, channel):
+        """Copy this box, its members and nested boxes shifted by (dx, dy).
+           `channel` is the copy's own setting; members get the copy's effective channel."""
+        st = self.get_state()
+        st.update(x=st["x"] + dx, y=st["y"] + dy, channel=channel, lock_ccs=True)
+        new_gb = add_group_box(st)   # locked while copying so CCs are kept
+        member_ch = new_gb.effective_channel()
 
-                elif wtype == "button":
-                    ms = payload.get_state()
-                    ms["x"], ms["y"] = m.winfo_x() + dx, m.winfo_y() + dy
-                    ms["channel"] = new_channel
-                    add_midi_button(ms)
+        for m in list(self.members):
+            wtype, payload = _identify_widget_for_drf(m)
+            if wtype is None:
+                continue
+            ms = _control_state(wtype, payload)
+            ms["x"], ms["y"] = m._geom["x"] + dx, m._geom["y"] + dy
+            ms["channel"] = member_ch
+            _spawn_control(ms)
 
-                elif wtype == "radio":
-                    ms = payload.get_state()
-                    ms["x"], ms["y"] = m.winfo_x() + dx, m.winfo_y() + dy
-                    ms["channel"] = new_channel
-                    add_radio_group(ms)
+        for child in list(self.child_boxes):
+            # an own channel shifts like the top box's, so kept numbers never land on the original's channel
+            child._clone_subtree(dx, dy, None if child.channel is None else int(child.channel) % 16 + 1)
 
-        finally:
-            new_gb._lock_var.set(original_lock)
-            new_gb.auto_assign_ccs.set(not original_lock)
-            new_gb.update_channel_label()
+        new_gb._lock_var.set(self._lock_var.get())
+        new_gb.update_channel_label()
+        return new_gb
 
-        new_gb.compute_members()
-        schedule_scroll_update()
     def get_state(self):
                 """Serialize this group box for save/load."""
-                try:
-                    self.update_idletasks()
-                    info = self.place_info()
-                except Exception:
-                    info = {}
-
-                def _safe_int(v, fallback):
-                    try:
-                        return int(v)
-                    except Exception:
-                        return fallback
-
-                x = _safe_int(info.get("x", self.winfo_x()), self.winfo_x())
-                y = _safe_int(info.get("y", self.winfo_y()), self.winfo_y())
-                w = _safe_int(info.get("width", self.winfo_width()), self.winfo_width())
-                h = _safe_int(info.get("height", self.winfo_height()), self.winfo_height())
+                g = self._geom
+                x, y, w, h = g["x"], g["y"], g["width"], g["height"]
 
                 return {
                     "type": "group_box",
                     "title": self.title.get(),
-                    "channel": int(self.channel),
+                    "channel": None if self.channel is None else int(self.channel),
                     "lock_ccs": bool(self._lock_var.get()),
                     "x": x,
                     "y": y,
@@ -1769,13 +2745,15 @@ def add_group_box(state=None):
     gb = GroupBoxFrame(scrollable_frame, title=title, state=state, bg=COL_BG, bd=0, highlightthickness=0)
     gb.place(x=x, y=y, width=w, height=h)
     group_boxes.append(gb)
-    gb.compute_members()
-    gb._redraw()
-
-    try:
-        gb.lower()
-    except Exception:
+    if TRUST_SAVED_GROUPS:
         pass
+    elif DEFER_GROUP_ASSIGN:
+        gb.collect_members()
+    else:
+        gb.compute_members()
+    gb.update_channel_label()
+    gb._redraw()
+    gb._restack()
 
     gb.update_grips()
     schedule_scroll_update()
@@ -1784,26 +2762,35 @@ def add_group_box(state=None):
 # ---------------- Slider helpers ----------------
 
 
-def resize_slider(slider_entry):
-    container   = slider_entry["container"]
-    slider      = slider_entry["slider"]
-    name_entry  = slider_entry["name_entry"]
+def _set_slider_quietly(slider_entry, value):
+    """Move a slider without sending MIDI. Scale calls its command from its idle
+       redraw, after any flag set around set() is already down, so the entry
+       remembers the value that command must swallow instead."""
+    value = max(0, min(127, int(value)))
+    if int(slider_entry["slider"].get()) == value:
+        return   # Scale fires no command for an unchanged value
+    slider_entry["quiet"] = value
+    slider_entry["slider"].set(value)
 
-    container.update_idletasks()
+def resize_slider(slider_entry):
+    """Fit the Scale to its frame using cached geometry (no layout flush)."""
+    slider = slider_entry["slider"]
 
-    name_h = name_entry.winfo_reqheight()
-    value_label = None
-    for w in container.grid_slaves(row=1, column=0):
-        value_label = w
-        break
-    value_h = value_label.winfo_reqheight() if value_label else 0
+    # name/value label heights only change with the fonts, so measure them once
+    reserved = slider_entry.get("reserved_h")
+    if reserved is None:
+        reserved = slider_entry["name_entry"].winfo_reqheight() + slider_entry["value_label"].winfo_reqheight()
+        slider_entry["reserved_h"] = reserved
 
-    reserved = name_h + value_h
-    height   = container.winfo_height()
-    width    = container.winfo_width()
+    geom  = slider_entry["frame"]._geom
+    inset = slider_entry.get("inset", 0)
+    height = geom["height"] - inset
+    width  = geom["width"] - inset
 
-    slider_length = max(20, height - reserved)
-    slider.config(length=slider_length, width=max(30, int(width)))
+    size = (max(20, height - reserved), max(30, int(width)))
+    if slider_entry.get("_scale_size") != size:
+        slider_entry["_scale_size"] = size
+        slider.config(length=size[0], width=size[1])
 
     fr = slider_entry["frame"]
     if hasattr(fr, "grips"):
@@ -1815,10 +2802,9 @@ def resize_slider(slider_entry):
                 pass
 
 def slider_state(slider_entry):
-    frame = slider_entry["frame"]
-    frame.update_idletasks()
-    info = frame.place_info()
+    info = slider_entry["frame"]._geom
     return {
+        "id": slider_entry["frame"]._cid,
         "value": slider_entry["slider"].get(),
         "mode": slider_entry["mode"].get(),
         "channel": _to_channel_int_or_none(slider_entry["channel"].get()),
@@ -1902,7 +2888,8 @@ def send_midi(value, channel_var, control_var, mode_var):
         return
     try:
         value = int(float(value))
-        channel = _to_ch_or_default(channel_var.get()) - 1
+        channel_raw = channel_var.get() if hasattr(channel_var, "get") else channel_var
+        channel = _to_ch_or_default(channel_raw) - 1
         control_raw = control_var.get() if hasattr(control_var, "get") else control_var
         mode = mode_var.get() if hasattr(mode_var, "get") else str(mode_var)
 
@@ -1934,129 +2921,353 @@ def send_midi(value, channel_var, control_var, mode_var):
     except Exception as e:
         print("MIDI Error:", e)
 
-def _gather_cc_usage():
-    """
-    Return a dict:
-        { channel_int: { cc_number: [human_label, ...] } }
-    human_label is a small description of where that CC is used.
-    """
-    usage = {ch: {} for ch in range(1, 17)}
-
-    # Sliders
-    for entry in sliders:
-        try:
-            ch = int(entry["channel"].get())
-            c  = entry["control"].get()
-            if not _is_unassigned_cc(c):
-                cc = int(c)
-                lbl = f"Slider: {entry['name'].get()}"
-                usage[ch].setdefault(cc, []).append(lbl)
-        except Exception:
-            pass
-
-    # Buttons
-    for btn in buttons:
-        try:
-            ch = int(btn.channel.get())
-            c  = btn.control.get()
-            if not _is_unassigned_cc(c):
-                cc = int(c)
-                lbl = f"Button: {btn.name.get()}"
-                usage[ch].setdefault(cc, []).append(lbl)
-        except Exception:
-            pass
-
-    # Radio groups (consider each option control)
-    for rg in radio_groups:
-        try:
-            g  = rg["group"]
-            ch = int(g.channel.get())
-            for bd in getattr(g, "button_data", []):
-                c = bd.get("control", None)
-                if c is not None and not _is_unassigned_cc(c):
-                    cc = int(c)
-                    lbl = f"Radio: {bd.get('label','?')}"
-                    usage[ch].setdefault(cc, []).append(lbl)
-        except Exception:
-            pass
-
-    return usage
-
+def _describe_control(cid):
+    """Short label for a control id, e.g. '#4 Slider: Cutoff'."""
+    frame = _CONTROL_IDS.get(cid)
+    kind, handle = _WATCHED.get(frame, (None, None))
+    state = VIRTUAL_LAYOUT.record_for_id(cid) if frame is None and VIRTUAL_LAYOUT is not None else None
+    if state is not None:
+        kind = state.get("type")
+        if kind == "radio":
+            return f"#{cid} Radio: " + "/".join(bd.get("label", "?") for bd in state.get("buttons", [])) + " (off screen)"
+        return f"#{cid} {str(kind).title()}: {state.get('name', '?')} (off screen)"
+    try:
+        if kind == "slider":
+            return f"#{cid} Slider: {handle['name'].get()}"
+        if kind == "button":
+            return f"#{cid} Button: {handle.name.get()}"
+        if kind == "radio":
+            return f"#{cid} Radio: " + "/".join(bd.get("label", "?") for bd in handle.button_data)
+    except Exception:
+        pass
+    return f"#{cid}"
 
 def show_ccs_by_channel_window():
-    """Open a read-only window listing all assigned CCs grouped by channel."""
+    """Live list of assigned CC/note numbers by channel; duplicates are highlighted.
+       Driven by the usage index, so only rows whose slot changed are redrawn."""
     win = tk.Toplevel(root)
     win.title("Assigned CCs by Channel")
     win.configure(bg=COL_FRAME)
     win.geometry("520x480")
 
+    summary_var = tk.StringVar()
+    tk.Label(win, textvariable=summary_var, bg=COL_FRAME, fg=COL_TEXT, font=FONT_LABEL, anchor="w")\
+        .pack(fill="x", padx=8, pady=(8, 0))
+
     txt = tk.Text(win, bg=COL_BG, fg=COL_TEXT, insertbackground=COL_ACCENT,
-                  relief="flat", wrap="word")
+                  relief="flat", wrap="none")
     txt.pack(fill="both", expand=True, padx=8, pady=8)
+    txt.tag_configure("dup", foreground="#ff5c5c")
+
+    shown = []        # sorted (channel, namespace, number) keys that have a row
+    conflicts = set() # keys with more than one control
+
+    def row_tag(key):
+        ch, ns, n = key
+        return f"ch{ch}_{ns.replace(' ', '')}_{n}"
+
+    def update_summary():
+        summary_var.set(f"{len(shown)} slots in use — {len(conflicts)} conflicting")
+
+    def redraw(key):
+        ch, ns, n = key
+        ids = _CC_USAGE.get((ch, ns), {}).get(n, [])
+        tag = row_tag(key)
+        pos = bisect.bisect_left(shown, key)
+        present = pos < len(shown) and shown[pos] == key
+        if present:
+            start, end = txt.tag_ranges(tag)[:2]
+            txt.delete(start, end)
+        if not ids:
+            if present:
+                shown.pop(pos)
+            conflicts.discard(key)
+            return
+        if not present:
+            shown.insert(pos, key)
+        nxt = shown[pos + 1] if pos + 1 < len(shown) else None
+        where = txt.tag_ranges(row_tag(nxt))[0] if nxt is not None else "end"
+        dup = len(ids) > 1
+        (conflicts.add if dup else conflicts.discard)(key)
+        slot = f"{ns} {n:>3}" if ns in NUMBERED_NAMESPACES else ns
+        line = f"Ch {ch:>2}  {slot}: " + ", ".join(_describe_control(cid) for cid in ids) + "\n"
+        txt.insert(where, line, (tag, "dup") if dup else (tag,))
+
+    def on_change(slots):
+        if not win.winfo_exists():
+            return
+        txt.config(state="normal")
+        for key in sorted(slots):
+            redraw(key)
+        txt.config(state="disabled")
+        update_summary()
+
+    for ch, ns in sorted(_CC_USAGE):
+        for n in sorted(_CC_USAGE[(ch, ns)]):
+            redraw((ch, ns, n))
+    txt.config(state="disabled")
+    update_summary()
 
-    usage = _gather_cc_usage()
-    for ch in range(1, 17):
-        items = usage[ch]
-        txt.insert("end", f"Channel {ch}\n", ("hdr",))
-        if not items:
-            txt.insert("end", "  (none)\n\n")
+    _USAGE_LISTENERS.append(on_change)
+    def close():
+        if on_change in _USAGE_LISTENERS:
+            _USAGE_LISTENERS.remove(on_change)
+        win.destroy()
+    win.protocol("WM_DELETE_WINDOW", close)
+
+    # Close button
+    btn = tk.Button(win, text="Close", command=close,
+                    bg=COL_ACCENT, fg=COL_TEXT, font=FONT_BUTTON, relief="flat", width=12)
+    btn.pack(pady=(0, 8))
+
+# ---------------- Assign-all planner ----------------
+# Plans numbers for every unassigned control at once: grouped by the box that
+# owns it (ungrouped controls by their own channel) and by namespace, rows then
+# columns inside a group, one contiguous block per group where the channel has room.
+def _needs_assignment(kind, handle):
+    if kind == "slider":
+        return handle["mode"].get() in NUMBERED_NAMESPACES and _is_unassigned_cc(handle["control"].get())
+    if handle.mode.get() not in NUMBERED_NAMESPACES:
+        return False
+    if kind == "button":
+        return _is_unassigned_cc(handle.control.get())
+    return any(_is_unassigned_cc(bd.get("control")) for bd in handle.button_data)
+
+def _free_run(free, k):
+    """Lowest start of k consecutive set bits in `free`, or None."""
+    run = free
+    for i in range(1, k):
+        run &= free >> i
+        if not run:
+            return None
+    return (run & -run).bit_length() - 1 if run else None
+
+def _allocate_block(taken, namespace, start_channel, k):
+    """k slots from start_channel onward, contiguous if any channel has room; marks them in `taken`."""
+    channels = [((start_channel - 1 + off) % 16) + 1 for off in range(16)]
+    mask = _assignable_mask(namespace)
+    for ch in channels:
+        start = _free_run(mask & ~taken.get((ch, namespace), 0), k)
+        if start is not None:
+            taken[(ch, namespace)] = taken.get((ch, namespace), 0) | ((1 << k) - 1) << start
+            return [(ch, start + i) for i in range(k)]
+    slots = []
+    for _ in range(k):
+        for ch in channels:
+            free = mask & ~taken.get((ch, namespace), 0)
+            if free:
+                n = (free & -free).bit_length() - 1
+                taken[(ch, namespace)] = taken.get((ch, namespace), 0) | 1 << n
+                slots.append((ch, n))
+                break
+        else:
+            break   # every channel is full
+    return slots
+
+def plan_cc_assignment():
+    """[(group title, kind, handle, frame, channel, namespace, number)] for all unassigned live controls."""
+    groups = {}
+    for kind, handle, frame in _live_controls():
+        if not _needs_assignment(kind, handle):
             continue
-        for cc in sorted(items.keys()):
-            labels = ", ".join(items[cc])
-            txt.insert("end", f"  CC {cc:>3}: {labels}\n")
-        txt.insert("end", "\n")
+        ns = handle["mode"].get() if kind == "slider" else handle.mode.get()
+        box = frame._owner_box
+        if box is not None:
+            key = (box, ns, box.effective_channel())
+        else:
+            own = handle["channel"].get() if kind == "slider" else handle.channel.get()
+            key = (None, ns, _to_ch_or_default(own))
+        groups.setdefault(key, []).append((kind, handle, frame))
+
+    def group_order(key):
+        box, ns, ch = key
+        if box is None:
+            return (1, ch, 0, ns)
+        return (0, box._geom["y"], box._geom["x"], ns)
+
+    taken = dict(_CC_BITS)
+    plan = []
+    for key in sorted(groups, key=group_order):
+        box, ns, ch = key
+        title = f"{box.title.get()} — {ns}" if box is not None else f"(ungrouped, Ch {ch}) — {ns}"
+        members = sorted(groups[key], key=lambda m: (m[2]._geom["y"], m[2]._geom["x"]))
+        slots = _allocate_block(taken, ns, ch, len(members))
+        for (kind, handle, frame), (slot_ch, n) in zip(members, slots):
+            plan.append((title, kind, handle, frame, slot_ch, ns, n))
+        if len(slots) < len(members):
+            print(f"No free CCs left for {len(members) - len(slots)} control(s) in {title}.")
+    return plan
+
+def _binding_snapshot(kind, handle):
+    if kind == "slider":
+        return handle["channel"].get(), handle["control"].get()
+    if kind == "button":
+        return handle.channel.get(), handle.control.get()
+    return handle.channel.get(), [bd.get("control") for bd in handle.button_data]
+
+def _set_binding(kind, handle, channel, control):
+    """Write a channel/number pair (radios: per-option list or one number for all)."""
+    if kind == "slider":
+        handle["channel"].set(str(channel))
+        handle["control"].set(_to_str_or_empty(control))
+    elif kind == "button":
+        handle.channel.set(str(channel))
+        handle.control.set(_to_str_or_empty(control))
+    else:
+        handle.channel.set(str(channel))
+        controls = control if isinstance(control, list) else [control] * len(handle.button_data)
+        for bd, c in zip(handle.button_data, controls):
+            bd["control"] = _to_int_or_none(c)
+        handle.refresh_bindings()
+
+def apply_cc_plan(plan):
+    """Apply a plan all-or-nothing; usage listeners are notified once at the end."""
+    for _title, kind, handle, frame, ch, ns, n in plan:
+        mode = handle["mode"].get() if kind == "slider" else handle.mode.get()
+        stale = (frame not in _WATCHED or mode != ns or not _needs_assignment(kind, handle)
+                 or _CC_BITS.get((ch, ns), 0) >> n & 1)
+        if stale:
+            print("Bindings changed since the plan was made; run Assign All again.")
+            return False
+
+    listeners, changed = _USAGE_LISTENERS[:], set()
+    _USAGE_LISTENERS[:] = [changed.update]
+    undo = []
+    try:
+        for _title, kind, handle, _frame, ch, _ns, n in plan:
+            undo.append((kind, handle, _binding_snapshot(kind, handle)))
+            _set_binding(kind, handle, ch, n)
+        return True
+    except Exception as e:
+        print("Assign All failed, rolling back:", e)
+        for kind, handle, (ch, control) in reversed(undo):
+            _set_binding(kind, handle, ch, control)
+        return False
+    finally:
+        _USAGE_LISTENERS[:] = listeners
+        if changed:
+            for listener in listeners:
+                listener(changed)
+
+def open_assign_all_planner():
+    """Preview the whole-layout assignment plan and apply it on confirmation."""
+    plan = plan_cc_assignment()
+
+    win = tk.Toplevel(root)
+    win.title("Assign All CCs")
+    win.configure(bg=COL_FRAME)
+    win.geometry("520x480")
 
+    txt = tk.Text(win, bg=COL_BG, fg=COL_TEXT, relief="flat", wrap="none")
+    txt.pack(fill="both", expand=True, padx=8, pady=8)
     txt.tag_configure("hdr", foreground=COL_ACCENT, font=FONT_HEADER)
+    if not plan:
+        txt.insert("end", "Every control already has a CC/Note.\n")
+    last_title = None
+    for title, _kind, _handle, frame, ch, ns, n in plan:
+        if title != last_title:
+            txt.insert("end", f"{title}\n", ("hdr",))
+            last_title = title
+        txt.insert("end", f"  Ch {ch:>2}  {ns} {n:>3}  {_describe_control(frame._cid)}\n")
     txt.config(state="disabled")
 
-    # Close button
-    btn = tk.Button(win, text="Close", command=win.destroy,
-                    bg=COL_ACCENT, fg=COL_TEXT, font=FONT_BUTTON, relief="flat", width=12)
-    btn.pack(pady=(0, 8))
+    bottom = tk.Frame(win, bg=COL_FRAME)
+    bottom.pack(fill="x", padx=8, pady=(0, 8))
+    def apply_and_close():
+        apply_cc_plan(plan)
+        win.destroy()
+    tk.Button(bottom, text="Apply", command=apply_and_close, state="normal" if plan else "disabled",
+              bg=COL_ACCENT, fg=COL_TEXT, font=FONT_BUTTON, relief="flat", width=10).pack(side="right")
+    tk.Button(bottom, text="Cancel", command=win.destroy,
+              bg=COL_FRAME, fg=COL_TEXT, font=FONT_BUTTON, relief="flat", width=10).pack(side="right", padx=8)
+
+def _value_for_binding(mode, control, msg):
+    """Value an incoming message carries for a slider/button binding, or None if it doesn't match."""
+    if mode in ("CC", "Note") and _is_unassigned_cc(control):
+        return None
+    if mode == "CC":
+        if msg.type == "control_change" and msg.control == int(control):
+            return msg.value
+    elif mode == "Note":
+        if msg.type == "note_on" and msg.note == int(control):
+            return msg.velocity
+        if msg.type == "note_off" and msg.note == int(control):
+            return 0
+    elif mode == "Pitch Bend" and msg.type == "pitchwheel":
+        return int(((msg.pitch + 8192) / 16383.0) * 127)
+    elif mode == "Aftertouch" and msg.type == "aftertouch":
+        return msg.value
+    return None
+
+_RADIO_TABLES = {}   # ((control, value), ...) of a radio's options -> _nearest_option_tables()
+
+def _radio_index_for_msg(button_data, mode, msg):
+    """Option index (nearest value) an incoming message selects in a radio group, or None.
+       Shares the live radios' lookup tables, cached per distinct set of options."""
+    if mode == "CC" and msg.type == "control_change":
+        number, value = msg.control, msg.value
+    elif mode == "Note" and msg.type == "note_on":
+        number, value = msg.note, getattr(msg, "velocity", 0)
+    elif mode == "Aftertouch" and msg.type == "aftertouch":
+        number, value = 0, msg.value
+    else:
+        return None
+    key = tuple((_to_int_or_none(bd.get("control")), int(bd.get("value", 0))) for bd in button_data)
+    tables = _RADIO_TABLES.get(key)
+    if tables is None:
+        if len(_RADIO_TABLES) >= 256:
+            _RADIO_TABLES.clear()
+        tables = _RADIO_TABLES[key] = _nearest_option_tables(
+            (i, control, value) for i, (control, value) in enumerate(key))
+    table = tables.get(int(number))
+    if table is None:
+        return None
+    return table[max(0, min(127, int(value)))]
+
+def _apply_midi_to_record(rec, msg):
+    """Apply an incoming message to a saved-state dict (no widget behind it).
+    Returns the matched value (option index for radios) or None."""
+    kind = rec.get("type")
+    if kind not in ("slider", "button", "radio"):
+        return None
+    ch = _to_ch_or_default(rec.get("channel")) - 1
+    if getattr(msg, "channel", ch) != ch:
+        return None
+    mode = rec.get("mode", "CC")
+    if kind == "radio":
+        idx = _radio_index_for_msg(rec.get("buttons", []), mode, msg)
+        if idx is not None:
+            rec["selected"] = idx
+        return idx
+    val = _value_for_binding(mode, rec.get("control"), msg)
+    if val is None:
+        return None
+    if kind == "slider":
+        rec["value"] = val
+    elif rec.get("latch"):
+        rec["latched"] = val >= 64
+    return val
+
 def _apply_incoming_midi_to_ui(msg):
     """Runs on the Tk main thread. Updates widgets in response to a MIDI message."""
 
     # ---------- SLIDERS ----------
     for entry in sliders:
-        mode = entry["mode"].get()
         ch = _to_ch_or_default(entry["channel"].get()) - 1
         if getattr(msg, "channel", ch) != ch:
             continue
-
-        ctrl_text = entry["control"].get()
-        if mode == "CC" and msg.type == "control_change" and not _is_unassigned_cc(ctrl_text):
-            if msg.control == int(ctrl_text):
-                entry["slider"].set(msg.value)
-        elif mode == "Note":
-            if not _is_unassigned_cc(ctrl_text):
-                if msg.type == "note_on" and msg.note == int(ctrl_text):
-                    entry["slider"].set(msg.velocity)
-                elif msg.type == "note_off" and msg.note == int(ctrl_text):
-                    entry["slider"].set(0)
-        elif mode == "Pitch Bend" and msg.type == "pitchwheel":
-            val = int(((msg.pitch + 8192) / 16383.0) * 127)
-            entry["slider"].set(val)
-        elif mode == "Aftertouch" and msg.type == "aftertouch":
-            entry["slider"].set(msg.value)
+        val = _value_for_binding(entry["mode"].get(), entry["control"].get(), msg)
+        if val is not None:
+            _set_slider_quietly(entry, val)
 
     # ---------- BUTTONS ----------
     for btn in buttons:
-        mode = btn.mode.get()
         ch = _to_ch_or_default(btn.channel.get()) - 1
         if getattr(msg, "channel", ch) != ch:
             continue
-
-        ctrl_text = btn.control.get()
-        if mode == "CC" and msg.type == "control_change" and not _is_unassigned_cc(ctrl_text):
-            if msg.control == int(ctrl_text):
-                btn.set_from_midi(msg.value)
-        elif mode == "Note" and not _is_unassigned_cc(ctrl_text):
-            if msg.type == "note_on" and msg.note == int(ctrl_text):
-                btn.set_from_midi(msg.velocity)
-            elif msg.type == "note_off" and msg.note == int(ctrl_text):
-                btn.set_from_midi(0)
-        elif mode == "Aftertouch" and msg.type == "aftertouch":
-            btn.set_from_midi(msg.value)
+        val = _value_for_binding(btn.mode.get(), btn.control.get(), msg)
+        if val is not None:
+            btn.set_from_midi(val)
 
     # ---------- RADIO GROUPS ----------
     for rg in radio_groups:
@@ -2074,6 +3285,12 @@ def _apply_incoming_midi_to_ui(msg):
         elif mode == "Aftertouch" and msg.type == "aftertouch":
             group.set_from_midi_cc(0, msg.value)
 
+    # ---------- CANVAS RENDERER / OFF-SCREEN RECORDS ----------
+    if CANVAS_SURFACE is not None:
+        CANVAS_SURFACE.apply_midi(msg)
+    if VIRTUAL_LAYOUT is not None:
+        VIRTUAL_LAYOUT.apply_midi(msg)
+
 
 def listen_midi_input():
     """(Re)start the single MIDI input listener for selected_input_port."""
@@ -2131,12 +3348,12 @@ def show_context_menu(event, slider_entry):
     menu.tk_popup(event.x_root, event.y_root)
 
 # ---------------- Save/Load ----------------
-def save_state():
-    file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
-    if not file_path:
-        return
+def _collect_layout_state():
+    """Snapshot every control and group box as the dict save_state() writes."""
+    if CANVAS_SURFACE is not None:
+        return {"widgets": CANVAS_SURFACE.to_state(), **_snapshot_bank_state()}
 
-    data = {"widgets": []}
+    data = {"widgets": [], **_snapshot_bank_state()}
 
     for entry in sliders:
         try:
@@ -2162,36 +3379,90 @@ def save_state():
         except Exception as e:
             print(f"Error saving radio group: {e}")
 
+    if VIRTUAL_LAYOUT is not None:
+        data["widgets"].extend(VIRTUAL_LAYOUT.offscreen_states())
+
     for gb in group_boxes:
         try:
             data["widgets"].append(gb.get_state())
         except Exception as e:
             print(f"Error saving group box: {e}")
 
-    try:
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2)
-        current_filename.set(file_path.split("/")[-1])
-        root.title(f"MIDI Controller - {current_filename.get()}")
-        print("Session saved:", file_path)
-    except Exception as e:
-        print(f"Final save error: {e}")
-
-def load_state():
-    file_path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
-    if not file_path:
-        return
-
-    try:
-        with open(file_path, "r") as f:
-            data = json.load(f)
-            print("Widgets in JSON:", data.get("widgets"))
-            print("Widget count:", len(data.get("widgets", [])))
-    except Exception as e:
-        print("Failed to load:", e)
-        return
-
-    # Clear existing
+    if VIRTUAL_LAYOUT is None:   # off-screen records have no live membership to save
+        data["groups"] = _saved_memberships(data["widgets"])
+    return data
+
+def _layout_geometry_checksum(widgets):
+    """CRC of every widget's type, id and rectangle, in file order.
+       Memberships follow from exactly this, so equal checksums mean equal memberships."""
+    crc = 0
+    for w in widgets:
+        t = w.get("type")
+        if t in _LAYOUT_TYPES:
+            crc = zlib.crc32(struct.pack("<Biiiii", _LAYOUT_TYPES.index(t), _opt_int(w.get("id")),
+                                         int(w.get("x", 0)), int(w.get("y", 0)),
+                                         int(w.get("width", 0)), int(w.get("height", 0))), crc)
+    return crc
+
+def _saved_memberships(widgets):
+    """Group tree for the layout file: per group box (in save order) its parent's
+       index and the ids of the controls it owns directly."""
+    index = {gb: i for i, gb in enumerate(group_boxes)}
+    boxes = [{"parent": index.get(gb.parent_box), "members": [m._cid for m in gb.members]}
+             for gb in group_boxes]
+    return {"checksum": _layout_geometry_checksum(widgets), "boxes": boxes}
+
+def _restore_memberships(widgets, groups):
+    """Link the freshly loaded frames exactly as saved, without spatial queries.
+       False (nothing changed) if the saved tree does not fit the live frames."""
+    box_items = [w for w in widgets if w.get("type") == "group_box"]
+    if len(box_items) != len(groups["boxes"]) or len(box_items) != len(group_boxes):
+        return False
+    at = {}
+    for gb in group_boxes:
+        g = gb._geom
+        at.setdefault((g["x"], g["y"], g["width"], g["height"]), []).append(gb)
+    order = []
+    for w in box_items:
+        bucket = at.get((w.get("x", 60), w.get("y", 60), w.get("width", 320), w.get("height", 240)))
+        if not bucket:
+            return False
+        order.append(bucket.pop(0))
+    kinds = {_to_int_or_none(w.get("id")): w.get("type") for w in widgets}
+    saved_at = {_to_int_or_none(w.get("id")): (w.get("x"), w.get("y"), w.get("width"), w.get("height"))
+                for w in widgets if w.get("type") != "group_box"}
+    owned = []
+    for box in groups["boxes"]:
+        frames = [_CONTROL_IDS.get(cid) for cid in box["members"]]
+        # every id must reach a control of the kind saved under it, not just any control
+        if None in frames or any(_WATCHED.get(f, (None,))[0] != kinds.get(cid) for cid, f in zip(box["members"], frames)):
+            return False
+        owned.append(frames)
+
+    for _kind, _handle, frame in _live_controls():
+        frame._owner_box = None
+    for gb in order:
+        gb.parent_box, gb.child_boxes, gb.members = None, [], []
+    for gb, box, frames in zip(order, groups["boxes"], owned):
+        if box["parent"] is not None:
+            gb.parent_box = order[box["parent"]]
+            gb.parent_box.child_boxes.append(gb)
+        gb.members = _by_creation(frames)
+        for frame in frames:
+            frame._owner_box = gb
+    for gb in order:
+        gb.child_boxes = _by_creation(gb.child_boxes)
+        gb.update_channel_label()
+        gb._restack()
+    # Controls added or moved while a chunked load was running are not where the file says.
+    for _kind, _handle, frame in _live_controls():
+        g = frame._geom
+        if saved_at.get(frame._cid) != (g["x"], g["y"], g["width"], g["height"]):
+            _set_owner(frame, _innermost_box_at(*_rect_center(_drf_bbox(frame))))
+    return True
+
+def _clear_layout():
+    """Destroy every control and group box frame."""
     for entry in sliders[:]:
         remove_slider(entry)
 
@@ -2220,8 +3491,10 @@ def load_state():
         if isinstance(widget, DraggableResizableFrame):
             widget.destroy()
 
-    # Recreate (widgets first, then group boxes)
-    for item in data.get("widgets", []):
+def _build_layout(widgets, settle_groups=True):
+    """Recreate widgets from saved dicts (controls first, then group boxes).
+       settle_groups=False leaves membership/assignment to the caller."""
+    for item in widgets:
         t = item.get("type")
         if t == "slider":
             add_slider(item)
@@ -2230,21 +3503,1247 @@ def load_state():
         elif t == "radio":
             add_radio_group(item)
 
-    for item in data.get("widgets", []):
+    for item in widgets:
         if item.get("type") == "group_box":
             add_group_box(item)
 
     # Recompute memberships and assign CCs for all group boxes
+    if TRUST_SAVED_GROUPS or not settle_groups:
+        return
     for gb in group_boxes:
         gb.compute_members()
 
-    current_filename.set(file_path.split("/")[-1])
-    root.title(f"MIDI Controller - {current_filename.get()}")
-    print("Session loaded:", file_path)
+def _apply_box_state(gb, state):
+    """Reconfigure an existing group box in place from a saved-state dict."""
+    gb.place(x=state.get("x", 60), y=state.get("y", 60),
+             width=state.get("width", 320), height=state.get("height", 240))
+    gb.title.set(state.get("title", "Group"))
+    gb.channel = state.get("channel", 1)
+    gb._lock_var.set(bool(state.get("lock_ccs", False)))
+    gb.update_channel_label()
+    gb._redraw()
+
+def _reconcile_layout(widgets):
+    """Turn the live layout into `widgets` with as little churn as possible.
+
+    Incoming records are matched to live controls by id, then by type and
+    position, then to any leftover control of the same type; matches are
+    updated in place (skipped when nothing differs). Group boxes match by
+    rectangle, then any leftover box. Unmatched live widgets are destroyed.
+    Returns (records nobody matched, for the caller to create; rectangles
+    whose ownership may have changed; frames that were reconfigured).
+    """
+    global DEFER_GROUP_ASSIGN
+    live = {}   # kind -> [(handle, frame)]
+    for kind, handle, frame in _live_controls():
+        live.setdefault(kind, []).append((handle, frame))
+    by_id = {frame._cid: (kind, handle, frame)
+             for kind, pairs in live.items() for handle, frame in pairs}
+    taken = set()
+    pairs_out = []   # (kind, handle, frame, state)
+    pending = []
+    for item in widgets:
+        kind = item.get("type")
+        if kind not in ("slider", "button", "radio"):
+            continue
+        hit = by_id.get(_to_int_or_none(item.get("id")))
+        if hit is not None and hit[0] == kind and hit[2] not in taken:
+            taken.add(hit[2])
+            pairs_out.append((kind, hit[1], hit[2], item))
+        else:
+            pending.append(item)
+
+    at = {}
+    for kind, pairs in live.items():
+        for handle, frame in pairs:
+            if frame not in taken:
+                g = frame._geom
+                at.setdefault((kind, g["x"], g["y"]), []).append((handle, frame))
+    leftover = []
+    for item in pending:
+        kind = item.get("type")
+        bucket = at.get((kind, item.get("x", 10), item.get("y", 10)))
+        if bucket:
+            handle, frame = bucket.pop()
+            taken.add(frame)
+            pairs_out.append((kind, handle, frame, item))
+        else:
+            leftover.append(item)
+    spare = {kind: [(h, f) for h, f in pairs if f not in taken] for kind, pairs in live.items()}
+    to_create = []
+    for item in leftover:
+        kind = item.get("type")
+        if spare.get(kind):
+            handle, frame = spare[kind].pop(0)
+            pairs_out.append((kind, handle, frame, item))
+        else:
+            to_create.append(item)
+
+    rects = []     # everything whose group box may change
+    changed = []   # reconfigured frames, which may need channel/CC assignment
+    for kind, pairs in spare.items():
+        for handle, frame in pairs:
+            _remove_control(kind, handle)   # destroy() takes it out of its box
+    # Ids in two phases: first free every reused frame's id and reserve all of the
+    # file's, so each incoming id lands on the frame it was matched to (even when
+    # two controls swap ids) and controls created later cannot take one of them.
+    same = []
+    for kind, handle, frame, item in pairs_out:
+        current = _control_state(kind, handle)
+        same.append(all(current.get(k) == v for k, v in item.items()))
+        if _CONTROL_IDS.get(frame._cid) is frame:
+            del _CONTROL_IDS[frame._cid]
+        frame._cid = None
+    incoming_ids = [_to_int_or_none(item.get("id")) for item in widgets
+                    if item.get("type") in ("slider", "button", "radio")]
+    _note_control_id(max((cid for cid in incoming_ids if cid is not None), default=0))
+    updated = 0
+    for (kind, handle, frame, item), unchanged in zip(pairs_out, same):
+        if unchanged:
+            _set_control_id(frame, item.get("id"))
+            continue
+        old = _drf_bbox(frame)
+        _apply_state(kind, handle, item)
+        if _drf_bbox(frame) != old:
+            rects += [old, _drf_bbox(frame)]
+        changed.append(frame)
+        updated += 1
+
+    box_items = [item for item in widgets if item.get("type") == "group_box"]
+    boxes = {}
+    for gb in group_boxes:
+        g = gb._geom
+        boxes.setdefault((g["x"], g["y"], g["width"], g["height"]), []).append(gb)
+    unmatched = []
+    for item in box_items:
+        key = (item.get("x", 60), item.get("y", 60), item.get("width", 320), item.get("height", 240))
+        if boxes.get(key):
+            gb = boxes[key].pop()
+            current = gb.get_state()
+            if not all(current.get(k) == v for k, v in item.items()):
+                _apply_box_state(gb, item)
+                changed.append(gb)
+        else:
+            unmatched.append(item)
+    spare_boxes = [gb for bucket in boxes.values() for gb in bucket]
+    for item in unmatched:
+        if spare_boxes:
+            gb = spare_boxes.pop(0)
+            rects.append(_drf_bbox(gb))
+            _apply_box_state(gb, item)
+            rects.append(_drf_bbox(gb))
+            changed.append(gb)
+        else:
+            to_create.append(item)
+    # The layout is half old, half new here; their area is relinked in _settle_after_diff.
+    DEFER_GROUP_ASSIGN = True
+    try:
+        for gb in spare_boxes:
+            rects.append(_drf_bbox(gb))
+            try: group_boxes.remove(gb)
+            except ValueError: pass
+            gb.destroy()
+    finally:
+        DEFER_GROUP_ASSIGN = False
+
+    print(f"Layout diff: {updated} updated, {len(pairs_out) - updated} unchanged, "
+          f"{sum(len(p) for p in spare.values()) + len(spare_boxes)} removed, {len(to_create)} to create")
+    return to_create, rects, changed
+
+def _settle_after_diff(rects, changed, first_new_seq):
+    """Finish a diff load: relink around what moved and apply channels/CCs only to
+       reconfigured frames and frames created after `first_new_seq`."""
+    new = [f for f in DRF_INSTANCES if f._seq > first_new_seq]
+    rects = rects + [_drf_bbox(f) for f in new]
+    if rects:
+        _relink_region(rects)   # assigns wherever an owner or parent changed
+    for frame in changed + new:
+        try:
+            if getattr(frame, "is_group_box", False):
+                frame._propagate_channel()
+            elif frame._owner_box is not None:
+                box = frame._owner_box
+                box.apply_channel_to_members([frame])
+                if box.auto_assign_ccs.get():
+                    box._assign_missing_ccs_from_first_free([frame])
+        except Exception as e:
+            print("Group assignment failed:", e)
+
+def _build_layout_chunked(widgets, on_done=None, settle_groups=True, trust=False):
+    """Like _build_layout, but LOAD_CHUNK widgets per event-loop turn with a progress
+       window and Cancel. Group assignment and the scroll region are settled once at the end;
+       on_done(cancelled) runs afterwards. trust=True builds each chunk under
+       TRUST_SAVED_GROUPS (memberships restored by the caller)."""
+    if _LOAD["cancel"] is not None:
+        _LOAD["cancel"]()   # a previous load is still running
+
+    spawners = {"slider": add_slider, "button": add_midi_button, "radio": add_radio_group}
+    queue = [item for item in widgets if item.get("type") in spawners]
+    queue += [item for item in widgets if item.get("type") == "group_box"]
+    total = len(queue)
+
+    win = tk.Toplevel(root)
+    win.title("Loading")
+    win.configure(bg=COL_FRAME)
+    win.resizable(False, False)
+    win.transient(root)
+    status_var = tk.StringVar(value=f"0 / {total}")
+    tk.Label(win, textvariable=status_var, bg=COL_FRAME, fg=COL_TEXT, font=FONT_LABEL)\
+        .pack(padx=12, pady=(12, 4))
+    bar = ttk.Progressbar(win, length=260, maximum=max(1, total), mode="determinate")
+    bar.pack(padx=12, pady=4)
+
+    state = {"pos": 0}
+
+    def finish(cancelled):
+        if _LOAD["after"] is not None:
+            root.after_cancel(_LOAD["after"])
+        _LOAD["after"] = _LOAD["cancel"] = None
+        for gb in (group_boxes if settle_groups and not trust else []):
+            # memberships are already linked; apply channels/CCs once
+            gb.apply_channel_to_members()
+            if gb.auto_assign_ccs.get():
+                gb._assign_missing_ccs_from_first_free()
+        _end_suppression()
+        try:
+            win.destroy()
+        except Exception:
+            pass
+        if on_done is not None:
+            on_done(cancelled)
+
+    def step():
+        global DEFER_GROUP_ASSIGN, TRUST_SAVED_GROUPS
+        _LOAD["after"] = None
+        end = min(total, state["pos"] + LOAD_CHUNK)
+        # Only for this chunk: between turns the user's own edits link and assign normally.
+        DEFER_GROUP_ASSIGN, TRUST_SAVED_GROUPS = True, trust
+        try:
+            for item in queue[state["pos"]:end]:
+                try:
+                    if item.get("type") == "group_box":
+                        add_group_box(item)
+                    else:
+                        spawners[item["type"]](item)
+                except Exception as e:
+                    print("Failed to load widget:", e)
+        finally:
+            DEFER_GROUP_ASSIGN = TRUST_SAVED_GROUPS = False
+        state["pos"] = end
+        status_var.set(f"{end} / {total}")
+        bar["value"] = end
+        if end >= total:
+            finish(False)
+        else:
+            _LOAD["after"] = root.after(1, step)
+
+    def cancel():
+        print(f"Load cancelled after {state['pos']} of {total} widgets.")
+        finish(True)
+
+    tk.Button(win, text="Cancel", command=cancel,
+              bg=COL_ACCENT, fg=COL_TEXT, font=FONT_BUTTON, relief="flat", width=10)\
+        .pack(pady=(4, 12))
+    win.protocol("WM_DELETE_WINDOW", cancel)
+
+    _LOAD["cancel"] = cancel
+    _begin_suppression()
+    _LOAD["after"] = root.after(1, step)
 
+LAYOUT_FILETYPES = [("JSON Files", "*.json"), ("Binary Layout", "*" + LAYOUT_BINARY_EXT)]
+
+def save_state():
+    file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=LAYOUT_FILETYPES)
+    if not file_path:
+        return
+
+    data = _collect_layout_state()
+
+    try:
+        write_layout_file(file_path, data)
+        current_filename.set(file_path.split("/")[-1])
+        root.title(f"MIDI Controller - {current_filename.get()}")
+        print("Session saved:", file_path)
+    except Exception as e:
+        print(f"Final save error: {e}")
+
+def load_state():
+    file_path = filedialog.askopenfilename(
+        filetypes=[("Layouts", "*.json *" + LAYOUT_BINARY_EXT)] + LAYOUT_FILETYPES)
+    if not file_path:
+        return
+
+    try:
+        data = read_layout_file(file_path)
+        print("Widget count:", len(data.get("widgets", [])))
+    except Exception as e:
+        print("Failed to load:", e)
+        return
+
+    def loaded(cancelled=False):
+        if cancelled:   # the canvas holds part of the file now, which is no saved setup
+            current_filename.set("")
+            root.title("MIDI Controller")
+            return
+        current_filename.set(file_path.split("/")[-1])
+        root.title(f"MIDI Controller - {current_filename.get()}")
+        print("Session loaded:", file_path)
+
+    _load_layout_data(data, loaded)
+
+def _load_layout_data(data, on_done=None):
+    """Replace the current layout with `data` in whichever renderer is active;
+       on_done(cancelled) runs once everything is built."""
+    global TRUST_SAVED_GROUPS, DEFER_GROUP_ASSIGN
+    if _LOAD["cancel"] is not None:
+        _LOAD["cancel"]()   # stop a chunked load that is still running
+    _AUTOSAVE["paused"] = True   # the load is one edit; snapshot it when done
+
+    widgets = data.get("widgets", [])
+    groups = data.get("groups")
+    _load_snapshot_bank(data.get("snapshots"))
+    # Saved memberships and bindings are only valid for exactly the geometry they were saved with.
+    trusted = bool(groups) and CANVAS_SURFACE is None and VIRTUAL_LAYOUT is None \
+        and groups.get("checksum") == _layout_geometry_checksum(widgets)
+
+    def finished(cancelled=False):
+        if trusted:
+            if cancelled or not _restore_memberships(widgets, groups):
+                print("Saved group memberships not usable; recomputing.")
+                for gb in group_boxes:
+                    gb.compute_members()
+        _AUTOSAVE["paused"] = False
+        schedule_scroll_update()
+        canvas.xview_moveto(0)
+        canvas.yview_moveto(0)
+        autosave_now()
+        if on_done is not None:
+            on_done(cancelled)
+
+    if CANVAS_SURFACE is not None:
+        CANVAS_SURFACE.set_records(widgets)
+    elif VIRTUAL_LAYOUT is not None:
+        VIRTUAL_LAYOUT.load(widgets)
+    else:
+        # Reuse what is already on screen; only the difference is built and assigned.
+        TRUST_SAVED_GROUPS = trusted
+        try:
+            to_create, rects, changed = _reconcile_layout(widgets)
+        finally:
+            TRUST_SAVED_GROUPS = False
+        first_new_seq = next(_DRF_SEQ)
+
+        def settle(cancelled=False):
+            if not trusted:
+                _settle_after_diff(rects, changed, first_new_seq)
+            finished(cancelled)
+
+        if len(to_create) > LOAD_CHUNK:
+            _build_layout_chunked(to_create, settle, settle_groups=False, trust=trusted)
+            return
+        DEFER_GROUP_ASSIGN, TRUST_SAVED_GROUPS = True, trusted
+        try:
+            _build_layout(to_create, settle_groups=False)
+        finally:
+            DEFER_GROUP_ASSIGN = TRUST_SAVED_GROUPS = False
+        settle()
+        return
+    finished()
+
+# ---------------- Autosave / crash journal ----------------
+# Every AUTOSAVE_MS the layout is snapshotted on the Tk thread (plain dicts) and
+# a writer thread serializes it to AUTOSAVE_PATH via temp file + os.replace.
+# Between snapshots, edited/removed controls are appended to an append-only
+# journal (one JSON op per line, flushed every JOURNAL_FLUSH_MS). A snapshot
+# truncates the journal; a clean exit deletes both, so finding either at
+# startup means the last session crashed and can be recovered.
+AUTOSAVE_MS = 60000
+JOURNAL_FLUSH_MS = 500
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".midtk")
+AUTOSAVE_PATH = os.path.join(AUTOSAVE_DIR, "autosave.json")
+JOURNAL_PATH = os.path.join(AUTOSAVE_DIR, "autosave.journal")
+
+_AUTOSAVE = {"paused": False, "dirty": {}, "deleted": [], "boxes": False,
+             "flush": None, "tick": None, "thread": None}
+_AUTOSAVE_JOBS = SimpleQueue()
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _autosave_writer():
+    """Writer thread: runs snapshot/journal/discard jobs in submission order."""
+    while True:
+        kind, payload = _AUTOSAVE_JOBS.get()
+        if kind == "stop":
+            return
+        try:
+            os.makedirs(AUTOSAVE_DIR, exist_ok=True)
+            if kind == "snapshot":
+                _write_atomic(AUTOSAVE_PATH, json.dumps(payload))
+                open(JOURNAL_PATH, "w").close()   # the snapshot covers everything journaled so far
+            elif kind == "journal":
+                with open(JOURNAL_PATH, "a") as f:
+                    f.writelines(json.dumps(op) + "\n" for op in payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            elif kind == "discard":
+                for path in (AUTOSAVE_PATH, JOURNAL_PATH):
+                    if os.path.exists(path):
+                        os.remove(path)
+        except Exception as e:
+            print("Autosave failed:", e)
+
+def _autosave_submit(kind, payload=None):
+    if _AUTOSAVE["thread"] is None:
+        _AUTOSAVE["thread"] = threading.Thread(target=_autosave_writer, daemon=True)
+        _AUTOSAVE["thread"].start()
+    _AUTOSAVE_JOBS.put((kind, payload))
+
+def _journal_touch(frame):
+    """Note that a control (or any group box) changed; flushed to the journal shortly."""
+    if _AUTOSAVE["paused"]:
+        return
+    if getattr(frame, "is_group_box", False):
+        _AUTOSAVE["boxes"] = True
+    elif frame in _WATCHED:
+        _AUTOSAVE["dirty"][frame] = None
+    else:
+        return
+    if _AUTOSAVE["flush"] is None:
+        _AUTOSAVE["flush"] = root.after(JOURNAL_FLUSH_MS, _journal_flush)
+
+def _journal_removed(cid):
+    if _AUTOSAVE["paused"] or cid is None:
+        return
+    _AUTOSAVE["deleted"].append(cid)
+    if _AUTOSAVE["flush"] is None:
+        _AUTOSAVE["flush"] = root.after(JOURNAL_FLUSH_MS, _journal_flush)
+
+def _journal_flush():
+    _AUTOSAVE["flush"] = None
+    ops = [{"op": "del", "id": cid} for cid in _AUTOSAVE["deleted"]]
+    for frame in _AUTOSAVE["dirty"]:
+        watched = _WATCHED.get(frame)
+        if watched is not None:
+            ops.append({"op": "put", "state": _control_state(*watched)})
+    if _AUTOSAVE["boxes"]:
+        ops.append({"op": "boxes", "boxes": [gb.get_state() for gb in group_boxes]})
+    _AUTOSAVE["dirty"].clear()
+    _AUTOSAVE["deleted"].clear()
+    _AUTOSAVE["boxes"] = False
+    if ops:
+        _autosave_submit("journal", ops)
+
+def autosave_now():
+    """Snapshot the layout now; serialization and the write happen on the writer thread."""
+    if _AUTOSAVE["flush"] is not None:
+        root.after_cancel(_AUTOSAVE["flush"])
+        _AUTOSAVE["flush"] = None
+    _AUTOSAVE["dirty"].clear()
+    _AUTOSAVE["deleted"].clear()
+    _AUTOSAVE["boxes"] = False
+    try:
+        _autosave_submit("snapshot", _collect_layout_state())
+    except Exception as e:
+        print("Autosave snapshot failed:", e)
+
+def _autosave_tick():
+    _AUTOSAVE["tick"] = root.after(AUTOSAVE_MS, _autosave_tick)
+    if not _AUTOSAVE["paused"]:
+        autosave_now()
+
+def _recovered_layout():
+    """Last snapshot with the journal replayed on top, or None if there is nothing to recover."""
+    if not (os.path.exists(AUTOSAVE_PATH) or os.path.exists(JOURNAL_PATH)):
+        return None
+    data = {"widgets": []}
+    if os.path.exists(AUTOSAVE_PATH):
+        with open(AUTOSAVE_PATH) as f:
+            data = json.load(f)
+    controls = [w for w in data.get("widgets", []) if w.get("type") != "group_box"]
+    boxes = [w for w in data.get("widgets", []) if w.get("type") == "group_box"]
+    by_id = {w["id"]: i for i, w in enumerate(controls) if w.get("id") is not None}
+    ops = 0
+    if os.path.exists(JOURNAL_PATH):
+        with open(JOURNAL_PATH) as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break   # torn final line from the crash
+                ops += 1
+                if op["op"] == "put":
+                    st = op["state"]
+                    if st.get("id") in by_id:
+                        controls[by_id[st["id"]]] = st
+                    else:
+                        by_id[st.get("id")] = len(controls)
+                        controls.append(st)
+                elif op["op"] == "del" and op["id"] in by_id:
+                    controls[by_id.pop(op["id"])] = None
+                elif op["op"] == "boxes":
+                    boxes = op["boxes"]
+    if not controls and not boxes and not ops:
+        return None
+    return {"widgets": [w for w in controls if w is not None] + boxes,
+            "snapshots": data.get("snapshots", {})}
+
+def start_autosave():
+    """Offer crash recovery, then start the periodic snapshots."""
+    try:
+        data = _recovered_layout()
+    except Exception as e:
+        print("Could not read autosave:", e)
+        data = None
+    if data is not None and messagebox.askyesno(
+            "Recover Session",
+            f"The previous session ended unexpectedly.\nRestore its {len(data['widgets'])} widgets?"):
+        _load_layout_data(data, lambda cancelled: print("Session recovered from autosave."))
+    else:
+        _autosave_submit("discard")   # never append this session onto the crashed one's journal
+    _AUTOSAVE["tick"] = root.after(AUTOSAVE_MS, _autosave_tick)
+
+def stop_autosave():
+    """Clean exit: drop the autosave files and let the writer finish."""
+    if _AUTOSAVE["tick"] is not None:
+        root.after_cancel(_AUTOSAVE["tick"])
+    if _AUTOSAVE["flush"] is not None:
+        root.after_cancel(_AUTOSAVE["flush"])
+    _autosave_submit("discard")
+    _autosave_submit("stop")
+    _AUTOSAVE["thread"].join(timeout=1.0)
+
+# ---------------- Value snapshots ----------------
+# A layout carries a bank of named value snapshots (e.g. one per song section).
+# Each is a bytearray holding two bytes per control id: the control's kind
+# (index into _SNAPSHOT_KINDS + 1, SNAPSHOT_UNSET where it has nothing) and its
+# slider value, latch state (0/127) or radio index. The kind lets recall refuse an
+# id that now belongs to a different kind of control instead of misapplying it.
+# Recall diffs against the current values and only touches and sends what differs.
+SNAPSHOT_UNSET = 0
+_SNAPSHOT_KINDS = ("slider", "button", "radio")
+SNAPSHOT_BANK = {}   # name -> bytearray, in creation order
+
+def _control_value(kind, handle):
+    """Snapshot byte for a live control, or None if it has no recallable value."""
+    if kind == "slider":
+        return max(0, min(127, int(handle["slider"].get())))
+    if kind == "button":
+        if not handle.latch_mode.get():
+            return None   # momentary buttons have no resting value
+        return 127 if handle.latched else 0
+    return max(0, min(255, handle.selected.get()))
+
+def _record_value(state):
+    """Same as _control_value for an off-screen saved-state dict."""
+    kind = state.get("type")
+    if kind == "slider":
+        return max(0, min(127, int(state.get("value", 0))))
+    if kind == "button":
+        return (127 if state.get("latched") else 0) if state.get("latch") else None
+    if kind == "radio":
+        return max(0, min(255, int(state.get("selected", 0))))
+    return None
+
+def _snapshot_bank_state():
+    """{"snapshots": {name: base64}} for the layout file; empty when there are none."""
+    if not SNAPSHOT_BANK:
+        return {}
+    return {"snapshots": {name: base64.b64encode(bytes(blob)).decode("ascii")
+                          for name, blob in SNAPSHOT_BANK.items()}}
+
+def _load_snapshot_bank(snapshots):
+    SNAPSHOT_BANK.clear()
+    for name, encoded in (snapshots or {}).items():
+        try:
+            SNAPSHOT_BANK[name] = bytearray(base64.b64decode(encoded))
+        except (ValueError, TypeError) as e:
+            print(f"Skipping snapshot {name!r}: {e}")
+
+def capture_snapshot(name):
+    """Store the current value of every control under `name` (replacing it if present)."""
+    if CANVAS_SURFACE is not None:
+        print("Snapshots apply to the widget renderer only.")
+        return
+    values = {}
+    for kind, handle, frame in _live_controls():
+        v = _control_value(kind, handle)
+        if v is not None and frame._cid is not None:
+            values[frame._cid] = (kind, v)
+    if VIRTUAL_LAYOUT is not None:
+        for state in VIRTUAL_LAYOUT.records.values():
+            v, cid = _record_value(state), _to_int_or_none(state.get("id"))
+            if v is not None and cid is not None:
+                values[cid] = (state["type"], v)
+    blob = bytearray([SNAPSHOT_UNSET]) * (2 * (max(values, default=-1) + 1))
+    for cid, (kind, v) in values.items():
+        blob[2 * cid] = _SNAPSHOT_KINDS.index(kind) + 1
+        blob[2 * cid + 1] = v
+    SNAPSHOT_BANK[name] = blob
+    print(f"Snapshot {name!r}: {len(values)} values, {len(blob)} bytes")
+    autosave_now()
+
+def recall_snapshot(name):
+    """Set every control the snapshot covers; only differing values are changed and sent."""
+    blob = SNAPSHOT_BANK.get(name)
+    if blob is None:
+        return
+    if CANVAS_SURFACE is not None:
+        print("Snapshots apply to the widget renderer only.")
+        return
+
+    skipped = []
+
+    def wanted(cid, kind):
+        cid = _to_int_or_none(cid)
+        if cid is None or 2 * cid + 1 >= len(blob) or blob[2 * cid] == SNAPSHOT_UNSET:
+            return None
+        saved = _SNAPSHOT_KINDS[blob[2 * cid] - 1] if blob[2 * cid] <= len(_SNAPSHOT_KINDS) else "?"
+        if saved != kind:
+            skipped.append(f"#{cid} was a {saved}, now a {kind}")
+            return None
+        return blob[2 * cid + 1]
+
+    changed = []
+    for kind, handle, frame in _live_controls():
+        v = wanted(frame._cid, kind)
+        if v is None or _control_value(kind, handle) in (None, v):
+            continue
+        if kind == "radio" and v >= len(handle.button_data):
+            continue
+        changed.append((kind, handle, v))
+    offscreen = []
+    if VIRTUAL_LAYOUT is not None:
+        for state in VIRTUAL_LAYOUT.records.values():
+            v = wanted(state.get("id"), state.get("type"))
+            if v is None or _record_value(state) in (None, v):
+                continue
+            if state.get("type") == "radio" and v >= len(state.get("buttons", [])):
+                continue
+            offscreen.append((state, v))
+
+    # 1) model: every value in one pass; none of these sends anything itself
+    for kind, handle, v in changed:
+        if kind == "slider":
+            _set_slider_quietly(handle, v)
+        elif kind == "button":
+            handle.latched = v >= 64
+        else:
+            handle.selected.set(v)
+    for state, v in offscreen:
+        key = {"slider": "value", "button": "latched", "radio": "selected"}[state["type"]]
+        state[key] = (v >= 64) if key == "latched" else v
+
+    # 2) MIDI: exactly one message per changed control
+    if midi_out is not None:
+        for kind, handle, v in changed:
+            if kind == "slider":
+                send_midi(v, handle["channel"], handle["control"], handle["mode"])
+            elif kind == "button":
+                handle.send_midi(v)
+            else:
+                handle.send_midi()
+        for state, v in offscreen:
+            if state["type"] == "radio":
+                bd = state["buttons"][v]
+                send_midi(bd.get("value", 0), state.get("channel"), bd.get("control"), state.get("mode", "CC"))
+            else:
+                send_midi(v, state.get("channel"), state.get("control"), state.get("mode", "CC"))
+
+    # 3) visuals: button faces in one idle pass (Scales and radios redraw themselves)
+    def refresh():
+        for kind, handle, v in changed:
+            if kind == "button":
+                handle.set_from_midi(v)
+    if changed:
+        root.after_idle(refresh)
+    print(f"Recalled {name!r}: {len(changed) + len(offscreen)} controls changed")
+    if skipped:
+        print(f"Snapshot {name!r} skipped {len(skipped)} ids: " + "; ".join(skipped))
+
+def delete_snapshot(name):
+    if SNAPSHOT_BANK.pop(name, None) is not None:
+        autosave_now()
+
+def _store_snapshot_dialog():
+    name = simpledialog.askstring("Store Snapshot", "Snapshot name:", parent=root,
+                                  initialvalue=f"Snapshot {len(SNAPSHOT_BANK) + 1}")
+    name = (name or "").strip()
+    if name:
+        capture_snapshot(name)
+
+# ---------------- Canvas renderer ----------------
+# Draws every control as items on `canvas` instead of ~9 Tk widgets apiece.
+# Records are the same dicts save_state() writes, so switching back to
+# widgets is just _build_layout(records).
+CR_PAD = 4            # inner padding, same as the widget frames
+CR_SLIDER_HEAD = 44   # room for the name + value text above the trough
+CR_THUMB = 32         # matches tk.Scale sliderlength
+CR_GRIP = 12          # bottom-right resize handle while unlocked
+
+def _bucket_low(i: int, n: int) -> int:
+    n = max(1, int(n))
+    v = (i * 128) // n
+    return 1 if v <= 0 else min(127, v)
+
+class CanvasSurface:
+    """Hosts the whole layout on one Canvas with its own hit-testing and dragging."""
+    def __init__(self, cnv, records):
+        self.cnv = cnv
+        self.index = SpatialGrid()
+        self._recs = {}       # tag -> record dict
+        self._parts = {}      # tag -> {part name: canvas item id}
+        self._z = {}          # tag -> draw order (higher = on top)
+        self._seq = itertools.count()
+        self._zseq = itertools.count()
+        self._drag = None
+        self._pressed = None
+        self.set_records(records)
+        cnv.bind("<Button-1>", self._on_press)
+        cnv.bind("<B1-Motion>", self._on_motion)
+        cnv.bind("<ButtonRelease-1>", self._on_release)
+
+    def destroy(self):
+        for seq in ("<Button-1>", "<B1-Motion>", "<ButtonRelease-1>"):
+            self.cnv.unbind(seq)
+        self.cnv.delete("cr")
+        self._recs.clear()
+        self._parts.clear()
+
+    # ---- records ----
+    def set_records(self, records):
+        self.cnv.delete("cr")
+        self._recs.clear()
+        self._parts.clear()
+        self._z.clear()
+        self.index = SpatialGrid()
+        for rec in records:
+            _note_control_id(rec.get("id"))   # keep new ids clear of the loaded ones
+            self.add_record(copy.deepcopy(rec))
+        for tag, rec in self._recs.items():   # enclosing boxes may have come later in the file
+            if rec.get("type") == "group_box" and rec.get("channel", 1) is None:
+                self._draw(tag)
+        schedule_scroll_update()
+
+    def to_state(self):
+        return [copy.deepcopy(rec) for rec in self._recs.values()]
+
+    def add_record(self, rec):
+        tag = f"cr{next(self._seq)}"
+        self._recs[tag] = rec
+        self._z[tag] = next(self._zseq)
+        self._draw(tag)
+        return tag
+
+    def add(self, kind):
+        """Menu entry point: spawn a default control next to the last one of its kind."""
+        same = [r for r in self._recs.values() if r.get("type") == kind]
+        if same:
+            last = same[-1]
+            x = int(last.get("x", 0)) + int(last.get("width", 0)) + SPAWN_GAP
+            y = int(last.get("y", 0))
+        else:
+            x, y = 10, 10
+        x = max(0, round(x / GRID_SIZE) * GRID_SIZE)
+        y = max(0, round(y / GRID_SIZE) * GRID_SIZE)
+
+        if kind == "slider":
+            rec = {"type": "slider", "name": "Slider", "mode": "CC", "channel": 1, "control": None,
+                   "value": 0, "width": DEFAULT_WIDTH, "height": DEFAULT_HEIGHT_SLIDER}
+        elif kind == "button":
+            rec = {"type": "button", "name": "?", "mode": "CC", "channel": 1, "control": None,
+                   "latch": False, "latched": False, "width": DEFAULT_WIDTH, "height": DEFAULT_HEIGHT_BUTTON}
+        elif kind == "radio":
+            rec = {"type": "radio", "mode": "CC", "channel": 1, "selected": 0, "orientation": "vertical",
+                   "buttons": [{"label": f"{i+1}", "control": None, "value": _bucket_low(i, 3)} for i in range(3)],
+                   "width": 220, "height": 200}
+        else:
+            rec = {"type": "group_box", "title": "Group", "channel": 1, "lock_ccs": False,
+                   "width": 420, "height": 240}
+        rec["x"], rec["y"] = x, y
+        if kind != "group_box":   # same ids a widget would get, so snapshots and saved groups see it
+            rec["id"] = _NEXT_CID
+            _note_control_id(_NEXT_CID)
+        tag = self.add_record(rec)
+        schedule_scroll_update()
+        return tag
+
+    def extents(self):
+        right = bottom = 0
+        for _tag, (_x1, _y1, x2, y2) in self.index.items():
+            right = max(right, x2)
+            bottom = max(bottom, y2)
+        return right, bottom
+
+    # ---- drawing ----
+    @staticmethod
+    def _geom(rec):
+        return (int(rec.get("x", 0)), int(rec.get("y", 0)),
+                int(rec.get("width", MIN_WIDTH)), int(rec.get("height", MIN_HEIGHT)))
+
+    def _trough(self, rec):
+        x, y, w, h = self._geom(rec)
+        return x + CR_PAD, y + CR_SLIDER_HEAD, x + w - CR_PAD, y + h - CR_PAD
+
+    def _radio_cells(self, rec):
+        x, y, w, h = self._geom(rec)
+        n = max(1, len(rec.get("buttons", [])))
+        x1, y1, x2, y2 = x + CR_PAD, y + CR_PAD, x + w - CR_PAD, y + h - CR_PAD
+        cells = []
+        for i in range(n):
+            if rec.get("orientation") == "horizontal":
+                cw = (x2 - x1) / n
+                cells.append((x1 + i * cw + RADIO_PAD, y1, x1 + (i + 1) * cw - RADIO_PAD, y2))
+            else:
+                ch = (y2 - y1) / n
+                cells.append((x1, y1 + i * ch + RADIO_PAD, x2, y1 + (i + 1) * ch - RADIO_PAD))
+        return cells
+
+    def _box_label(self, rec):
+        """Title line for a group box record, showing the channel it inherits if it has none."""
+        ch, inherited = rec.get("channel", 1), ""
+        if ch is None:
+            inherited = " (inherited)"
+            x, y, w, h = self._geom(rec)
+            px, py = x + w // 2, y + h // 2
+            area = w * h
+            def box_area(r):
+                return self._geom(r)[2] * self._geom(r)[3]
+            hits = [self._recs[t] for t in self.index.query_point(px, py)]
+            enclosing = sorted((r for r in hits if r.get("type") == "group_box" and box_area(r) > area),
+                               key=box_area)
+            ch = next((r["channel"] for r in enclosing if r.get("channel") is not None), 1)
+        return f"{rec.get('title', 'Group')} — Ch {ch}{inherited}"
+
+    def _draw(self, tag):
+        cnv, rec = self.cnv, self._recs[tag]
+        cnv.delete(tag)
+        x, y, w, h = self._geom(rec)
+        tags = ("cr", tag)
+        parts = {}
+        kind = rec.get("type")
+
+        if kind == "group_box":
+            parts["box"] = cnv.create_rectangle(x + 1, y + 1, x + w - 1, y + h - 1, outline=COL_ACCENT,
+                                                width=2, dash=(5, 4), tags=tags)
+            parts["title"] = cnv.create_text(x + 6, y + 4, anchor="nw", fill=COL_ACCENT, font=FONT_LABEL,
+                                             text=self._box_label(rec), tags=tags)
+        else:
+            parts["frame"] = cnv.create_rectangle(x, y, x + w, y + h, fill=COL_FRAME, outline=COL_BTN,
+                                                  width=2, tags=tags)
+            if kind == "slider":
+                cx = x + w / 2
+                parts["name"] = cnv.create_text(cx, y + CR_PAD + 10, text=rec.get("name", "Slider"),
+                                                fill=COL_SLIDER_NAME, font=FONT_HEADER, tags=tags)
+                parts["value"] = cnv.create_text(cx, y + CR_PAD + 30, text=str(int(rec.get("value", 0))),
+                                                 fill=COL_SLIDER_VALUE, font=FONT_VALUE, tags=tags)
+                parts["trough"] = cnv.create_rectangle(*self._trough(rec), fill=COL_BG, outline="", tags=tags)
+                parts["thumb"] = cnv.create_rectangle(0, 0, 0, 0, fill=COL_ACCENT, outline="", tags=tags)
+            elif kind == "button":
+                parts["face"] = cnv.create_rectangle(x + CR_PAD, y + CR_PAD, x + w - CR_PAD, y + h - CR_PAD,
+                                                     fill=COL_BTN_DEFAULT, outline="", tags=tags)
+                parts["label"] = cnv.create_text(x + w / 2, y + h / 2, text=rec.get("name", "?"),
+                                                 fill=COL_TEXT, font=FONT_BUTTON, tags=tags)
+            elif kind == "radio":
+                for i, cell in enumerate(self._radio_cells(rec)):
+                    parts[f"opt{i}"] = cnv.create_rectangle(*cell, fill=COL_BTN, outline="", tags=tags)
+                    bd = rec["buttons"][i] if i < len(rec.get("buttons", [])) else {}
+                    parts[f"lbl{i}"] = cnv.create_text((cell[0] + cell[2]) / 2, (cell[1] + cell[3]) / 2,
+                                                       text=bd.get("label", f"{i+1}"), fill=BUTTON_FG,
+                                                       font=BUTTON_FONT, tags=tags)
+            parts["grip"] = cnv.create_rectangle(x + w - CR_GRIP, y + h - CR_GRIP, x + w, y + h,
+                                                 fill=COL_ACCENT, outline="", tags=tags + ("cr_grip",),
+                                                 state="hidden" if locked.get() else "normal")
+
+        self._parts[tag] = parts
+        self.index.update(tag, (x, y, x + w, y + h))
+        if kind == "group_box":
+            cnv.tag_lower(tag)
+        elif kind == "slider":
+            self._update_thumb(tag)
+        elif kind == "button":
+            self._update_button(tag)
+        elif kind == "radio":
+            self._update_radio(tag)
+
+    def _update_thumb(self, tag):
+        rec = self._recs[tag]
+        x1, y1, x2, y2 = self._trough(rec)
+        travel = max(0, (y2 - y1) - CR_THUMB)
+        v = max(0, min(127, int(rec.get("value", 0))))
+        ty = y1 + (1 - v / 127.0) * travel
+        self.cnv.coords(self._parts[tag]["thumb"], x1, ty, x2, ty + min(CR_THUMB, y2 - y1))
+        self.cnv.itemconfig(self._parts[tag]["value"], text=str(v))
+
+    def _update_button(self, tag, pressed=False):
+        rec = self._recs[tag]
+        if rec.get("latch"):
+            fill = COL_BTN_LATCHED if rec.get("latched") else COL_BTN_DEFAULT
+        else:
+            fill = COL_BTN_HOVER if pressed else COL_BTN_DEFAULT
+        self.cnv.itemconfig(self._parts[tag]["face"], fill=fill)
+
+    def _update_radio(self, tag):
+        rec = self._recs[tag]
+        sel = rec.get("selected", 0)
+        for i in range(len(rec.get("buttons", []))):
+            self.cnv.itemconfig(self._parts[tag][f"opt{i}"], fill=COL_BTN_LATCHED if i == sel else COL_BTN)
+
+    def update_grips(self):
+        self.cnv.itemconfig("cr_grip", state="hidden" if locked.get() else "normal")
+
+    # ---- values / MIDI ----
+    def set_value(self, tag, value, send=True):
+        rec = self._recs[tag]
+        value = max(0, min(127, int(value)))
+        if value == rec.get("value"):
+            return
+        rec["value"] = value
+        self._update_thumb(tag)
+        if send and not UPDATING_FROM_MIDI:
+            send_midi(value, rec.get("channel"), rec.get("control"), rec.get("mode", "CC"))
+
+    def select(self, tag, idx, send=True):
+        rec = self._recs[tag]
+        rec["selected"] = idx
+        self._update_radio(tag)
+        if send:
+            bd = rec["buttons"][idx]
+            send_midi(bd.get("value", 0), rec.get("channel"), bd.get("control"), rec.get("mode", "CC"))
+
+    def apply_midi(self, msg):
+        for tag, rec in self._recs.items():
+            val = _apply_midi_to_record(rec, msg)
+            if val is None:
+                continue
+            kind = rec.get("type")
+            if kind == "slider":
+                self._update_thumb(tag)
+            elif kind == "radio":
+                self._update_radio(tag)
+            else:
+                self._update_button(tag, pressed=val > 0)
+
+    # ---- hit testing / pointer ----
+    def _hit(self, px, py):
+        hits = self.index.query_point(px, py)
+        controls = [t for t in hits if self._recs[t].get("type") != "group_box"]
+        pool = controls or hits
+        return max(pool, key=self._z.get) if pool else None
+
+    def _slider_value_at(self, tag, py):
+        x1, y1, x2, y2 = self._trough(self._recs[tag])
+        travel = max(1, (y2 - y1) - CR_THUMB)
+        return round((1 - (py - y1 - CR_THUMB / 2) / travel) * 127)
+
+    def _on_press(self, event):
+        px, py = self.cnv.canvasx(event.x), self.cnv.canvasy(event.y)
+        tag = self._hit(px, py)
+        if tag is None:
+            return
+        rec = self._recs[tag]
+        x, y, w, h = self._geom(rec)
+
+        if not locked.get():
+            resize = rec.get("type") != "group_box" and px >= x + w - CR_GRIP and py >= y + h - CR_GRIP
+            self._drag = {"tag": tag, "resize": resize, "px": event.x_root, "py": event.y_root,
+                          "x": x, "y": y, "w": w, "h": h}
+            if rec.get("type") != "group_box":
+                self.cnv.tag_raise(tag)
+                self._z[tag] = next(self._zseq)
+            DRAG.begin(self._drag_to)
+            return
+
+        self._pressed = tag
+        kind = rec.get("type")
+        if kind == "slider":
+            self.set_value(tag, self._slider_value_at(tag, py))
+        elif kind == "button":
+            if rec.get("latch"):
+                rec["latched"] = not rec.get("latched")
+                send_midi(127 if rec["latched"] else 0, rec.get("channel"), rec.get("control"), rec.get("mode", "CC"))
+                self._update_button(tag)
+            else:
+                send_midi(127, rec.get("channel"), rec.get("control"), rec.get("mode", "CC"))
+                self._update_button(tag, pressed=True)
+        elif kind == "radio":
+            for i, (x1, y1, x2, y2) in enumerate(self._radio_cells(rec)):
+                if x1 <= px <= x2 and y1 <= py <= y2:
+                    if i < len(rec.get("buttons", [])) and i != rec.get("selected"):
+                        self.select(tag, i)
+                    break
+
+    def _drag_to(self, x_root, y_root):
+        d = self._drag
+        if d is None:
+            return
+        rec = self._recs[d["tag"]]
+        dx, dy = x_root - d["px"], y_root - d["py"]
+        if d["resize"]:
+            rec["width"] = max(MIN_WIDTH, round((d["w"] + dx) / GRID_SIZE) * GRID_SIZE)
+            rec["height"] = max(MIN_HEIGHT, round((d["h"] + dy) / GRID_SIZE) * GRID_SIZE)
+            self._draw(d["tag"])
+        else:
+            nx, ny = int(d["x"] + dx), int(d["y"] + dy)
+            self.cnv.move(d["tag"], nx - rec["x"], ny - rec["y"])
+            rec["x"], rec["y"] = nx, ny
+
+    def _on_motion(self, event):
+        if self._drag is not None:
+            DRAG.push(event)
+            return
+        py = self.cnv.canvasy(event.y)
+        if self._pressed is not None and self._recs[self._pressed].get("type") == "slider":
+            self.set_value(self._pressed, self._slider_value_at(self._pressed, py))
+
+    def _on_release(self, event):
+        if self._drag is not None:
+            DRAG.finish(event)
+        d, self._drag = self._drag, None
+        if d is not None:
+            rec = self._recs[d["tag"]]
+            rec["x"] = max(0, round(rec["x"] / GRID_SIZE) * GRID_SIZE)
+            rec["y"] = max(0, round(rec["y"] / GRID_SIZE) * GRID_SIZE)
+            self._draw(d["tag"])
+            schedule_scroll_update()
+            return
+        tag, self._pressed = self._pressed, None
+        if tag is not None:
+            rec = self._recs[tag]
+            if rec.get("type") == "button" and not rec.get("latch"):
+                send_midi(0, rec.get("channel"), rec.get("control"), rec.get("mode", "CC"))
+                self._update_button(tag)
+
+def toggle_canvas_renderer():
+    """Switch between Tk widgets and the single-canvas renderer, keeping the layout."""
+    global CANVAS_SURFACE
+    # Rebuilding in the other renderer is not an edit; keep it out of the journal
+    # and start the journal afresh from a snapshot of the switched layout.
+    paused, _AUTOSAVE["paused"] = _AUTOSAVE["paused"], True
+    if CANVAS_SURFACE is None:
+        if VIRTUAL_LAYOUT is not None:
+            toggle_virtual_layout()
+        data = _collect_layout_state()
+        _clear_layout()
+        canvas.itemconfig(window_id, state="hidden")
+        CANVAS_SURFACE = CanvasSurface(canvas, data["widgets"])
+        print("Canvas renderer on:", len(data["widgets"]), "items")
+    else:
+        widgets = CANVAS_SURFACE.to_state()
+        CANVAS_SURFACE.destroy()
+        CANVAS_SURFACE = None
+        canvas.itemconfig(window_id, state="normal")
+        _build_layout(widgets)
+        print("Widget renderer on")
+    _AUTOSAVE["paused"] = paused
+    autosave_now()
     schedule_scroll_update()
-    canvas.xview_moveto(0)
-    canvas.yview_moveto(0)
+
+# ---------------- Viewport virtualization ----------------
+class VirtualLayout:
+    """Keeps only controls near the visible viewport as Tk widgets.
+
+    Everything else lives in self.records as saved-state dicts, indexed by a
+    SpatialGrid. refresh() retires widgets that scrolled away (reusing them
+    for records of the same kind that scrolled into view) and MIDI input
+    keeps updating the records while they are off screen.
+    """
+    def __init__(self):
+        self.records = {}            # key -> saved-state dict (off-screen only)
+        self._bindings = {}          # key -> _RecordBinding holding the record's CC/Note slots
+        self._ids = {}               # control id -> key
+        self.index = SpatialGrid()   # key -> rect, off-screen records only
+        self._keys = itertools.count()
+        self._extents = None
+        self.pinned = []             # group boxes kept fully live while they are being edited
+
+    def _adopt(self, frame):
+        frame._vkey = next(self._keys)
+        return frame._vkey
+
+    def _viewport(self):
+        x0, y0 = canvas.canvasx(0), canvas.canvasy(0)
+        m = VIRTUAL_MARGIN
+        return (x0 - m, y0 - m, x0 + canvas.winfo_width() + m, y0 + canvas.winfo_height() + m)
+
+    def _store(self, key, state):
+        x, y = int(state.get("x", 0)), int(state.get("y", 0))
+        w, h = int(state.get("width", 0)), int(state.get("height", 0))
+        self.records[key] = state
+        cid = _to_int_or_none(state.get("id"))
+        _note_control_id(cid)
+        # off-screen controls keep their slots so auto-assign and the planner see them
+        binding = self._bindings.setdefault(key, _RecordBinding())
+        binding._cid = cid
+        _claim_slots(binding, _record_slots(state))
+        if cid is not None:
+            self._ids[cid] = key
+        self.index.update(key, (x, y, x + w, y + h))
+        self._extents = None
+
+    def refresh(self):
+        global DEFER_GROUP_ASSIGN
+        # Off-screen records carry no box membership; a box being edited is
+        # pinned (see materialize_box) so its controls stay live until it is done.
+        regions = [self._viewport()] + [_drf_bbox(gb) for gb in self.pinned]
+        wanted = {}
+        for region in regions:
+            for key in self.index.query_rect(region):
+                wanted[key] = None
+
+        spare = {"slider": [], "button": [], "radio": []}
+        for kind, handle, frame in list(_live_controls()):
+            key = getattr(frame, "_vkey", None)
+            if key is None:
+                key = self._adopt(frame)
+            rect = _drf_bbox(frame)
+            if any(_rects_overlap(rect, region) for region in regions):
+                continue
+            self._store(key, _control_state(kind, handle))
+            set_selected(frame, False)
+            frame._vkey = None
+            spare[kind].append(handle)
+
+        # Swapping widgets for records is not an edit; keep it out of the journal.
+        paused, _AUTOSAVE["paused"] = _AUTOSAVE["paused"], True
+        DEFER_GROUP_ASSIGN = True
+        reused = []
+        try:
+            for key in sorted(wanted):
+                state = self._take(key)
+                self._extents = None
+                kind = state.get("type")
+                if spare.get(kind):
+                    handle = spare[kind].pop()
+                    _apply_state(kind, handle, state)
+                    frame = handle["frame"] if kind == "slider" else handle.master
+                    reused.append(frame)
+                else:
+                    handle = _spawn_control(state)   # linked by _maybe_assign_for_containing_group_box
+                    frame = handle["frame"] if kind == "slider" else handle.master
+                frame._vkey = key
+            for kind, handles in spare.items():
+                for handle in handles:
+                    _remove_control(kind, handle)
+        finally:
+            DEFER_GROUP_ASSIGN = False
+            _AUTOSAVE["paused"] = paused
+
+        # Only recycled frames moved; removed ones left their box in destroy().
+        for frame in reused:
+            _set_owner(frame, _innermost_box_at(*_rect_center(_drf_bbox(frame))), assign=False)
+        if wanted or any(spare.values()):
+            schedule_scroll_update()
+
+    def extents(self):
+        if self._extents is None:
+            right = bottom = 0
+            for _key, (_x1, _y1, x2, y2) in self.index.items():
+                right = max(right, x2)
+                bottom = max(bottom, y2)
+            self._extents = (right, bottom)
+        return self._extents
+
+    def _take(self, key):
+        """Remove a record (and its slot claims) and return it."""
+        state = self.records.pop(key)
+        self.index.remove(key)
+        _claim_slots(self._bindings.pop(key), ())
+        if self._ids.get(_to_int_or_none(state.get("id"))) == key:
+            del self._ids[_to_int_or_none(state.get("id"))]
+        return state
+
+    def _release_all(self):
+        for binding in self._bindings.values():
+            _claim_slots(binding, ())
+        self._bindings.clear()
+        self._ids.clear()
+        self.records.clear()
+
+    def record_for_id(self, cid):
+        key = self._ids.get(cid)
+        return None if key is None else self.records.get(key)
+
+    def offscreen_states(self):
+        return [copy.deepcopy(st) for st in self.records.values()]
+
+    def apply_midi(self, msg):
+        for state in self.records.values():
+            _apply_midi_to_record(state, msg)
+
+    def load(self, widgets):
+        _clear_layout()
+        self._release_all()
+        self.pinned = []
+        self.index = SpatialGrid()
+        self._extents = None
+        for item in widgets:
+            if item.get("type") in ("slider", "button", "radio"):
+                self._store(next(self._keys), copy.deepcopy(item))
+        for item in widgets:
+            if item.get("type") == "group_box":
+                add_group_box(item)
+        self.refresh()
+        for gb in group_boxes:
+            gb.compute_members()
+
+    def materialize_box(self, gb):
+        """Make every record under `gb` live and keep it so until unpin(gb)."""
+        global DEFER_GROUP_ASSIGN
+        self.pinned.append(gb)
+        paused, _AUTOSAVE["paused"] = _AUTOSAVE["paused"], True
+        DEFER_GROUP_ASSIGN = True
+        try:
+            for key in sorted(self.index.query_rect(_drf_bbox(gb))):
+                state = self._take(key)
+                handle = _spawn_control(state)   # linked by _maybe_assign_for_containing_group_box
+                frame = handle["frame"] if state.get("type") == "slider" else handle.master
+                frame._vkey = key
+        finally:
+            DEFER_GROUP_ASSIGN = False
+            _AUTOSAVE["paused"] = paused
+        self._extents = None
+
+    def unpin(self, gb):
+        if gb in self.pinned:
+            self.pinned.remove(gb)
+        schedule_viewport_refresh()
+
+    def materialize_all(self):
+        global DEFER_GROUP_ASSIGN
+        paused, _AUTOSAVE["paused"] = _AUTOSAVE["paused"], True
+        DEFER_GROUP_ASSIGN = True
+        try:
+            for key in sorted(self.records):
+                _spawn_control(self._take(key))   # the live control takes over the record's slots
+        finally:
+            DEFER_GROUP_ASSIGN = False
+            _AUTOSAVE["paused"] = paused
+        self._release_all()
+        self.index = SpatialGrid()
+        for gb in group_boxes:
+            gb.collect_members()
+        schedule_scroll_update()
+
+def toggle_virtual_layout():
+    """Turn viewport virtualization on/off for the widget renderer."""
+    global VIRTUAL_LAYOUT
+    if CANVAS_SURFACE is not None:
+        print("Virtualization applies to the widget renderer only.")
+        return
+    if VIRTUAL_LAYOUT is None:
+        VIRTUAL_LAYOUT = VirtualLayout()
+        VIRTUAL_LAYOUT.refresh()
+        print("Virtualized layout on:", len(VIRTUAL_LAYOUT.records), "controls off screen")
+    else:
+        layout, VIRTUAL_LAYOUT = VIRTUAL_LAYOUT, None
+        layout.materialize_all()
+        print("Virtualized layout off")
 
 def _process_midi_queue():
     """Main-thread pump: drain the MIDI queue and update the UI safely."""
@@ -2275,6 +4774,7 @@ def clear_focus(event):
         root.focus_set()
 
 def _on_close():
+    stop_autosave()
     # stop input thread
     try:
         midi_in_stop.set()
@@ -2306,5 +4806,6 @@ root.bind_all("<Button-1>", clear_focus, add="+")
 
 # Start the safe MIDI→UI pump
 root.after(10, _process_midi_queue)
+root.after(200, start_autosave)
 root.mainloop()
 # ==== END PART 2/2 ====
\ No newline at end of file